@@ -1,7 +1,12 @@
+from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo import MongoClient
+from app.services.metrics import MongoCommandListener
 from app.settings.config import MONGO_URI, MONGO_DB_NAME
 
-client = MongoClient(MONGO_URI)
+client = MongoClient(MONGO_URI, event_listeners=[MongoCommandListener()])
+
+# the API handlers await this one, the sync client stays for the worker, scripts and background threads
+async_client = AsyncIOMotorClient(MONGO_URI, event_listeners=[MongoCommandListener()])
 
 from fastapi import FastAPI, Depends
 app = FastAPI()
@@ -10,6 +15,11 @@ def get_db():
     return client[MONGO_DB_NAME]
 
 
+# async def, FastAPI runs plain def dependencies through the threadpool
+async def get_async_db():
+    return async_client[MONGO_DB_NAME]
+
+
 @app.on_event("shutdown")
 def shutdown_db_client():
     client.close()
\ No newline at end of file
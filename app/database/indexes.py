@@ -0,0 +1,86 @@
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from app.services.check_history import ensure_history_collections
+
+INDEXES = {
+    "servers": [
+        ([("user_id", ASCENDING), ("host", ASCENDING)], {"name": "user_host", "unique": True}),
+        ([("is_active", ASCENDING)], {"name": "is_active"}),
+        ([("user_id", ASCENDING), ("_id", ASCENDING)], {"name": "user_id_page"}),
+        ([("status_changed_at", ASCENDING)], {"name": "status_changed_at"}),
+    ],
+    "tokens": [
+        ([("token", ASCENDING)], {"name": "token", "unique": True}),
+        ([("user_id", ASCENDING)], {"name": "user_id"}),
+        ([("expire_at", ASCENDING)], {"name": "expire_at_ttl", "expireAfterSeconds": 0}),
+    ],
+    "contacts": [
+        ([("user_id", ASCENDING), ("email", ASCENDING)], {"name": "user_email", "unique": True}),
+        ([("user_id", ASCENDING), ("_id", ASCENDING)], {"name": "user_id_page"}),
+    ],
+    "users": [
+        ([("username", ASCENDING)], {"name": "username", "unique": True}),
+    ],
+    "monitor_logs": [
+        ([("server_id", ASCENDING), ("timestamp", DESCENDING)], {"name": "server_time"}),
+        ([("user_id", ASCENDING), ("timestamp", DESCENDING)], {"name": "user_time"}),
+    ],
+    "system_logs": [
+        ([("user_id", ASCENDING), ("timestamp", DESCENDING)], {"name": "user_time"}),
+        ([("timestamp", DESCENDING)], {"name": "timestamp"}),
+    ],
+    "worker_leases": [
+        ([("owner", ASCENDING)], {"name": "owner"}),
+    ],
+    "worker_members": [
+        ([("expires_at", ASCENDING)], {"name": "expires_at_ttl", "expireAfterSeconds": 0}),
+    ],
+}
+
+
+def ensure_indexes(db):
+    failed = []
+
+    for collection, indexes in INDEXES.items():
+        for keys, options in indexes:
+            try:
+                db[collection].create_index(keys, **options)
+            except OperationFailure as e:
+                # usually duplicates in old data blocking a unique index, keep going and report it
+                failed.append({"collection": collection, "index": options["name"], "error": str(e)})
+                print(f"[ERROR] INDEX {collection}.{options['name']} NOT CREATED: {e}")
+
+    ensure_history_collections(db)
+    return failed
+
+
+def index_report(db):
+    report = {}
+
+    for collection, indexes in INDEXES.items():
+        existing = {index["name"] for index in db[collection].list_indexes()}
+        declared = {options["name"] for _, options in indexes}
+
+        try:
+            usage = {row["name"]: row["accesses"]["ops"] for row in db[collection].aggregate([{"$indexStats": {}}])}
+        except OperationFailure:
+            usage = {}
+
+        report[collection] = {
+            "missing": sorted(declared - existing),
+            "undeclared": sorted(existing - declared - {"_id_"}),
+            "unused": sorted(name for name, ops in usage.items() if ops == 0 and name != "_id_"),
+        }
+
+    return report
+
+
+if __name__ == "__main__":
+    from app.database.database import get_db
+
+    db = get_db()
+    ensure_indexes(db)
+
+    for collection, status in index_report(db).items():
+        print(f"{collection}: {status}")
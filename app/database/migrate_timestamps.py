@@ -0,0 +1,173 @@
+import argparse
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne
+
+from app.settings.config import LEGACY_TIMEZONE
+
+LEGACY_FORMAT = "%d.%m.%Y %H:%M:%S"
+
+FIELDS = {
+    "system_logs": ["timestamp"],
+    "monitor_logs": ["timestamp"],
+    "users": ["created_at", "updated_at", "last_login_at"],
+    "servers": ["created_at", "updated_at", "last_checked_at", "last_alert_at"],
+    "contacts": ["created_at", "updated_at"],
+    "tokens": ["created_at"],
+}
+
+
+def parse_legacy(value):
+    try:
+        return datetime.strptime(value, LEGACY_FORMAT).replace(tzinfo=ZoneInfo(LEGACY_TIMEZONE)).astimezone(timezone.utc)
+    except ValueError:
+        pass
+
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def migrate_collection(db, collection, fields, batch_size, dry_run=False):
+    query = {"$or": [{field: {"$type": "string"}} for field in fields]}
+    projection = {field: 1 for field in fields}
+    stats = {"scanned": 0, "updated": 0, "unparsed": 0}
+    last_id = None
+
+    while True:
+        # walk by _id so unparseable documents are not picked up again
+        batch_query = query if last_id is None else {"$and": [query, {"_id": {"$gt": last_id}}]}
+        docs = list(db[collection].find(batch_query, projection).sort("_id", 1).limit(batch_size))
+
+        if not docs:
+            return stats
+
+        operations = []
+        for doc in docs:
+            stats["scanned"] += 1
+            changes = {}
+
+            for field in fields:
+                value = doc.get(field)
+                if not isinstance(value, str):
+                    continue
+
+                parsed = parse_legacy(value)
+                if parsed is None:
+                    stats["unparsed"] += 1
+                else:
+                    changes[field] = parsed
+
+            if changes:
+                operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": changes}))
+
+        if operations and not dry_run:
+            db[collection].bulk_write(operations, ordered=False)
+        stats["updated"] += len(operations)
+
+        last_id = docs[-1]["_id"]
+
+
+def server_oid(server_id):
+    try:
+        return ObjectId(server_id)
+    except (InvalidId, TypeError):
+        return None
+
+
+def backfill_log_owners(db, batch_size, dry_run=False):
+    # /logs/monitor filters on user_id, older monitor log entries only carry server_id
+    stats = {"scanned": 0, "updated": 0, "orphaned": 0}
+    last_id = None
+
+    while True:
+        batch_query = {"user_id": None} if last_id is None else {"user_id": None, "_id": {"$gt": last_id}}
+        docs = list(db.monitor_logs.find(batch_query, {"server_id": 1}).sort("_id", 1).limit(batch_size))
+
+        if not docs:
+            return stats
+
+        oids = {server_oid(doc.get("server_id")) for doc in docs} - {None}
+        owners = {str(s["_id"]): s["user_id"] for s in db.servers.find({"_id": {"$in": list(oids)}}, {"user_id": 1})}
+
+        operations = []
+        for doc in docs:
+            stats["scanned"] += 1
+            owner = owners.get(str(doc.get("server_id")))
+
+            if owner is None:
+                # the server was deleted, nothing to attribute the entry to
+                stats["orphaned"] += 1
+            else:
+                operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"user_id": owner}}))
+
+        if operations and not dry_run:
+            db.monitor_logs.bulk_write(operations, ordered=False)
+        stats["updated"] += len(operations)
+
+        last_id = docs[-1]["_id"]
+
+
+def backfill_token_expiry(db, batch_size, dry_run=False):
+    # the TTL index reads expire_at, tokens issued before it only have the expires_at epoch seconds
+    stats = {"scanned": 0, "updated": 0, "expired_now": 0}
+    now = datetime.now(timezone.utc)
+    last_id = None
+
+    while True:
+        batch_query = {"expire_at": {"$exists": False}} if last_id is None else {"expire_at": {"$exists": False}, "_id": {"$gt": last_id}}
+        docs = list(db.tokens.find(batch_query, {"expires_at": 1}).sort("_id", 1).limit(batch_size))
+
+        if not docs:
+            return stats
+
+        operations = []
+        for doc in docs:
+            stats["scanned"] += 1
+            expires_at = doc.get("expires_at")
+
+            if isinstance(expires_at, (int, float)):
+                expire_at = datetime.fromtimestamp(expires_at, timezone.utc)
+            else:
+                # validation already rejects a token without expires_at, let the TTL monitor remove it
+                expire_at = now
+                stats["expired_now"] += 1
+
+            operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"expire_at": expire_at}}))
+
+        if not dry_run:
+            db.tokens.bulk_write(operations, ordered=False)
+        stats["updated"] += len(operations)
+
+        last_id = docs[-1]["_id"]
+
+
+def migrate(db, batch_size=1000, dry_run=False):
+    report = {}
+    for collection, fields in FIELDS.items():
+        report[collection] = migrate_collection(db, collection, fields, batch_size, dry_run)
+        print(f"{collection}: {report[collection]}")
+
+    report["monitor_logs.user_id"] = backfill_log_owners(db, batch_size, dry_run)
+    print(f"monitor_logs.user_id: {report['monitor_logs.user_id']}")
+
+    report["tokens.expire_at"] = backfill_token_expiry(db, batch_size, dry_run)
+    print(f"tokens.expire_at: {report['tokens.expire_at']}")
+    return report
+
+
+if __name__ == "__main__":
+    from app.database.database import get_db
+
+    parser = argparse.ArgumentParser(description="Convert string timestamps to native UTC datetimes and backfill fields the new indexes rely on")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    migrate(get_db(), args.batch_size, args.dry_run)
@@ -0,0 +1,135 @@
+import queue
+import random
+import threading
+import time
+
+from app.settings.config import AUDIT_QUEUE_SIZE, AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL, AUDIT_MAX_LIST_ITEMS, AUDIT_MAX_STRING, AUDIT_READ_SAMPLE_RATE
+
+_queue = queue.Queue(maxsize=AUDIT_QUEUE_SIZE)
+_stop = threading.Event()
+_writer = None
+_writer_lock = threading.Lock()
+
+audit_stats = {"queued": 0, "written": 0, "dropped": 0, "sampled_out": 0, "batches": 0, "errors": 0}
+
+
+def shrink_payload(value, depth=0):
+    # copies the payload while trimming it, so later changes by the caller do not leak into the log
+    if isinstance(value, dict):
+        if depth > 4:
+            return "<nested>"
+        return {k: shrink_payload(v, depth + 1) for k, v in value.items()}
+
+    if isinstance(value, (list, tuple)):
+        items = [shrink_payload(v, depth + 1) for v in value[:AUDIT_MAX_LIST_ITEMS]]
+        if len(value) > AUDIT_MAX_LIST_ITEMS:
+            items.append({"truncated": len(value) - AUDIT_MAX_LIST_ITEMS})
+        return items
+
+    if isinstance(value, str) and len(value) > AUDIT_MAX_STRING:
+        return value[:AUDIT_MAX_STRING] + "..."
+
+    return value
+
+
+def should_sample(log_type):
+    if AUDIT_READ_SAMPLE_RATE >= 1 or not log_type.startswith("get"):
+        return True
+    return random.random() < AUDIT_READ_SAMPLE_RATE
+
+
+def queue_depth():
+    return _queue.qsize()
+
+
+def enqueue(db, log_doc):
+    if not should_sample(log_doc["type"]):
+        audit_stats["sampled_out"] += 1
+        return False
+
+    start_writer(db)
+
+    try:
+        _queue.put_nowait(log_doc)
+    except queue.Full:
+        audit_stats["dropped"] += 1
+        return False
+
+    audit_stats["queued"] += 1
+    return True
+
+
+def _write_batch(db, batch):
+    try:
+        db.system_logs.insert_many(batch, ordered=False)
+        audit_stats["written"] += len(batch)
+        audit_stats["batches"] += 1
+    except Exception as e:
+        audit_stats["errors"] += 1
+        print(f"[ERROR] AUDIT LOG WRITE FAILED: {e}")
+
+
+def _drain(limit):
+    batch = []
+    while len(batch) < limit:
+        try:
+            batch.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _collect(first):
+    # hold the batch open for up to one flush interval, steady traffic then costs one insert per interval, not per request
+    batch = [first]
+    deadline = time.monotonic() + AUDIT_FLUSH_INTERVAL
+
+    while len(batch) < AUDIT_BATCH_SIZE and not _stop.is_set():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+
+    return batch + _drain(AUDIT_BATCH_SIZE - len(batch))
+
+
+def _writer_loop(db):
+    while not _stop.is_set():
+        try:
+            first = _queue.get(timeout=AUDIT_FLUSH_INTERVAL)
+        except queue.Empty:
+            continue
+
+        _write_batch(db, _collect(first))
+
+    batch = _drain(AUDIT_BATCH_SIZE)
+    while batch:
+        _write_batch(db, batch)
+        batch = _drain(AUDIT_BATCH_SIZE)
+
+
+def start_writer(db):
+    global _writer
+
+    if _writer is not None:
+        return
+
+    with _writer_lock:
+        if _writer is None:
+            _stop.clear()
+            _writer = threading.Thread(target=_writer_loop, args=(db,), name="audit-log-writer", daemon=True)
+            _writer.start()
+
+
+def stop_writer(timeout=10):
+    global _writer
+
+    if _writer is None:
+        return
+
+    _stop.set()
+    _writer.join(timeout)
+    _writer = None
@@ -1,19 +1,31 @@
+import asyncio
+import multiprocessing
 import os
 import re
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 
 from cryptography import fernet
 from passlib.handlers.sha2_crypt import sha256_crypt
-import inspect
-from datetime import datetime
-from fastapi import Request, Depends
+from datetime import datetime, timezone
+from fastapi import Request, Depends, HTTPException
+
+from app.functions.audit_log import enqueue, shrink_payload
+from app.settings.config import PASSWORD_POOL_SIZE, PASSWORD_QUEUE_LIMIT, PASSWORD_JOB_TIMEOUT
+
+_password_pool = None
+_password_jobs = 0
+_password_jobs_lock = threading.Lock()
 
 def system_log(db,log_type: str,user_id=None,payload: dict = None,error: str = None,):
 
-    stack = inspect.stack()[1]
+    frame = sys._getframe(1)
 
-    caller_info = {"function": stack.function,"file": os.path.basename(stack.filename),"line": stack.lineno}
-    log_doc = {"type": log_type,"user_id": str(user_id) if user_id else None,"payload": payload or {},"error": error,"caller": caller_info,"timestamp":datetime.now().strftime("%d.%m.%Y %H:%M:%S")}
-    return db.system_logs.insert_one(log_doc)
+    caller_info = {"function": frame.f_code.co_name,"file": os.path.basename(frame.f_code.co_filename),"line": frame.f_lineno}
+    log_doc = {"type": log_type,"user_id": str(user_id) if user_id else None,"payload": shrink_payload(payload or {}),"error": error,"caller": caller_info,"timestamp":datetime.now(timezone.utc)}
+    return enqueue(db, log_doc)
 
 
 
@@ -25,12 +37,93 @@ def hash_password(password: str) -> str:
     return sha256_crypt.hash(password)
 
 
+def get_password_pool():
+    global _password_pool
+    if _password_pool is None:
+        # spawn, forking a process that already runs the audit and mongo threads can deadlock the child
+        _password_pool = ProcessPoolExecutor(max_workers=PASSWORD_POOL_SIZE, mp_context=multiprocessing.get_context("spawn"))
+    return _password_pool
+
+
+def warm_up():
+    return None
+
+
+def start_password_pool():
+    # spawn workers only start on submit, pay the spawn and import cost here instead of on the first logins
+    pool = get_password_pool()
+    wait([pool.submit(warm_up) for _ in range(PASSWORD_POOL_SIZE)])
+
+
+def reset_password_pool(pool):
+    global _password_pool
+    if _password_pool is pool:
+        _password_pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_password_pool():
+    global _password_pool
+    if _password_pool is not None:
+        _password_pool.shutdown(cancel_futures=True)
+        _password_pool = None
+
+
+def release_password_slot(future=None):
+    global _password_jobs
+    with _password_jobs_lock:
+        _password_jobs -= 1
+
+
+def submit_password_job(pool, func, *args):
+    global _password_jobs
+    with _password_jobs_lock:
+        _password_jobs += 1
+
+    try:
+        future = pool.submit(func, *args)
+    except Exception:
+        release_password_slot()
+        raise
+
+    # the slot is held until the process is done with the job, a timed out wait does not free it
+    future.add_done_callback(release_password_slot)
+    return future
+
+
+async def run_password_job(func, *args):
+    # reject right away instead of queueing logins behind a storm
+    if _password_jobs >= PASSWORD_QUEUE_LIMIT:
+        raise HTTPException(status_code=503, detail="Too many login requests, try again later")
+
+    try:
+        for attempt in range(2):
+            pool = get_password_pool()
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(submit_password_job(pool, func, *args)), PASSWORD_JOB_TIMEOUT)
+            except BrokenProcessPool:
+                # a worker died, replace the pool and try once more on a fresh one
+                reset_password_pool(pool)
+                if attempt:
+                    raise HTTPException(status_code=503, detail="Password service unavailable, try again later")
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Password check timed out, try again later")
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await run_password_job(verify_password, plain, hashed)
+
+
+async def hash_password_async(password: str) -> str:
+    return await run_password_job(hash_password, password)
+
+
 def is_valid_email(email: str) -> bool:
     pattern = r"^[\w\.-]+@[\w\.-]+\.\w+$"
     return re.match(pattern, email) is not None
 
 
-def get_request_info(request: Request):
+async def get_request_info(request: Request):
     client_ip = request.client.host if request else "unknown"
     user_agent = request.headers.get("User-Agent") if request else "unknown"
     return {"ip": client_ip, "user_agent": user_agent}
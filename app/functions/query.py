@@ -0,0 +1,75 @@
+import json
+
+from bson import ObjectId
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.settings.config import PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT, STREAM_BATCH_SIZE
+
+
+def parse_projection(fields, allowed):
+    if not fields:
+        return None
+
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    projection = {f: 1 for f in requested}
+    projection["_id"] = 1
+    return projection
+
+
+def parse_cursor(after):
+    if not after:
+        return None
+
+    try:
+        return ObjectId(after)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def none():
+    # stands in for an optional lookup inside asyncio.gather
+    return None
+
+
+def page_limit(limit):
+    if limit is None:
+        return PAGE_DEFAULT_LIMIT
+    return max(1, min(limit, PAGE_MAX_LIMIT))
+
+
+async def find_page(collection, query, projection, after, limit):
+    # keyset pagination on _id, every page is an index range scan no matter how deep
+    if after:
+        query = dict(query, _id={"$gt": after})
+
+    docs = await collection.find(query, projection).sort("_id", 1).limit(limit + 1).to_list(limit + 1)
+    next_cursor = None
+
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = str(docs[-1]["_id"])
+
+    for doc in docs:
+        doc["_id"] = str(doc["_id"])
+
+    return docs, next_cursor
+
+
+def stream_ndjson(collection, query, projection):
+
+    async def generate():
+        cursor = collection.find(query, projection).sort("_id", 1).batch_size(STREAM_BATCH_SIZE)
+        try:
+            async for doc in cursor:
+                doc["_id"] = str(doc["_id"])
+                yield json.dumps(doc, default=str) + "\n"
+        finally:
+            await cursor.close()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
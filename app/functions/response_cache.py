@@ -0,0 +1,104 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from bson import ObjectId
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.settings.config import RESPONSE_CACHE_SIZE, RESPONSE_CACHE_MAX_BYTES
+
+# per user counters, bumped by the routers on writes and by the worker on status changes
+VERSIONS = "user_versions"
+
+_cache = OrderedDict()
+_user_keys = {}
+_cache_lock = threading.Lock()
+response_cache_stats = {"hits": 0, "misses": 0, "not_modified": 0, "evictions": 0}
+
+
+async def current_version(db, user_id, kind):
+    doc = await db[VERSIONS].find_one({"_id": str(user_id)}, {kind: 1})
+    return (doc or {}).get(kind, 0)
+
+
+async def bump_version(db, user_id, *kinds):
+    await db[VERSIONS].update_one({"_id": str(user_id)}, {"$inc": {kind: 1 for kind in kinds}}, upsert=True)
+    drop_user(user_id)
+
+
+def make_etag(request, user_id, kind, version):
+    # same user, path and query on the same version always renders the same body
+    params = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    digest = hashlib.sha1(f"{user_id}|{request.url.path}|{params}".encode()).hexdigest()[:16]
+    return f'"{kind}-{version}-{digest}"'
+
+
+def etag_matches(request, etag):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+
+    # no "*": the tag is checked before the lookup, so it would answer 304 for ids that do not exist
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates
+
+
+def drop_user(user_id):
+    with _cache_lock:
+        for key in _user_keys.pop(str(user_id), ()):
+            _cache.pop(key, None)
+
+
+def cache_get(etag):
+    with _cache_lock:
+        entry = _cache.get(etag)
+        if entry is None:
+            response_cache_stats["misses"] += 1
+            return None
+
+        _cache.move_to_end(etag)
+        response_cache_stats["hits"] += 1
+        return entry[1]
+
+
+def cache_put(etag, user_id, body):
+    if len(body) > RESPONSE_CACHE_MAX_BYTES:
+        return
+
+    user_id = str(user_id)
+    with _cache_lock:
+        _cache[etag] = (user_id, body)
+        _cache.move_to_end(etag)
+        _user_keys.setdefault(user_id, set()).add(etag)
+
+        while len(_cache) > RESPONSE_CACHE_SIZE:
+            old_key, (old_user, _) = _cache.popitem(last=False)
+            keys = _user_keys.get(old_user)
+            if keys is not None:
+                keys.discard(old_key)
+                if not keys:
+                    del _user_keys[old_user]
+            response_cache_stats["evictions"] += 1
+
+
+# returns (etag, response), the response is a 304 or a cached body, None means the handler has to render
+async def conditional_response(request, db, user_id, kind):
+    etag = make_etag(request, user_id, kind, await current_version(db, user_id, kind))
+
+    if etag_matches(request, etag):
+        response_cache_stats["not_modified"] += 1
+        return etag, Response(status_code=304, headers={"ETag": etag})
+
+    body = cache_get(etag)
+    if body is not None:
+        return etag, Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+    return etag, None
+
+
+def cached_json(etag, user_id, content):
+    response = JSONResponse(jsonable_encoder(content, custom_encoder={ObjectId: str}), headers={"ETag": etag})
+    cache_put(etag, user_id, response.body)
+    return response
@@ -1,4 +1,8 @@
+import asyncio
+import threading
+import time
 import token
+from collections import OrderedDict
 from datetime import datetime, timezone, timedelta
 from os.path import exists
 
@@ -8,13 +12,69 @@ from fastapi import Depends
 # region Imports
 from fastapi.security import OAuth2PasswordBearer
 
-from app.database.database import get_db
-from app.settings.config import TOKEN_EXPIRE_MINUTES, ALGORITHM, SECRET_KEY
+from app.database.database import get_db, get_async_db
+from app.settings.config import TOKEN_EXPIRE_MINUTES, ALGORITHM, SECRET_KEY, AUTH_CACHE_SIZE, AUTH_CACHE_TTL
 
 # endregion Imports
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
+_auth_cache = OrderedDict()
+_user_tokens = {}
+_auth_cache_lock = threading.Lock()
+auth_cache_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _drop_cached_token(token):
+    entry = _auth_cache.pop(token, None)
+    if entry:
+        tokens = _user_tokens.get(entry["user_id"])
+        if tokens:
+            tokens.discard(token)
+            if not tokens:
+                _user_tokens.pop(entry["user_id"], None)
+
+
+def get_cached_auth(token):
+    with _auth_cache_lock:
+        entry = _auth_cache.get(token)
+
+        if entry is None:
+            auth_cache_stats["misses"] += 1
+            return None
+
+        if entry["cached_until"] < time.monotonic() or entry["expires_at"] < time.time():
+            _drop_cached_token(token)
+            auth_cache_stats["misses"] += 1
+            return None
+
+        _auth_cache.move_to_end(token)
+        auth_cache_stats["hits"] += 1
+        return entry
+
+
+def cache_auth(token, user_id, user, expires_at):
+    with _auth_cache_lock:
+        _drop_cached_token(token)
+        _auth_cache[token] = {"user_id": user_id, "user": user, "expires_at": expires_at, "cached_until": time.monotonic() + AUTH_CACHE_TTL}
+        _user_tokens.setdefault(user_id, set()).add(token)
+
+        while len(_auth_cache) > AUTH_CACHE_SIZE:
+            _drop_cached_token(next(iter(_auth_cache)))
+
+
+def invalidate_token(token):
+    with _auth_cache_lock:
+        _drop_cached_token(token)
+        auth_cache_stats["invalidations"] += 1
+
+
+def invalidate_user(user_id):
+    with _auth_cache_lock:
+        for cached_token in list(_user_tokens.get(str(user_id), ())):
+            _drop_cached_token(cached_token)
+        auth_cache_stats["invalidations"] += 1
+
 
 
 def create_access_token(data: dict):
@@ -32,24 +92,24 @@ def create_access_token(data: dict):
     return token,expire
 
 
-def save_token(token:str,user_id:str,expires_at:datetime,db=Depends(get_db)):
+async def save_token(token:str,user_id:str,expires_at:datetime,db=Depends(get_async_db)):
 
-    db.tokens.delete_one({"user_id":user_id})
+    await db.tokens.delete_one({"user_id":user_id})
+    invalidate_user(user_id)
 
     data = {
         "user_id":user_id,
         "expires_at":expires_at.timestamp(),
+        "expire_at":expires_at,
         "token":token,
-        "created_at":datetime.now(timezone.utc).isoformat(),
+        "created_at":datetime.now(timezone.utc),
     }
 
-    db.tokens.insert_one(data)
+    await db.tokens.insert_one(data)
     return {"success":True}
 
 
-def validate_token(token:str, db=Depends(get_db)):
-
-    result = db.tokens.find_one({"token":token})
+def check_token(result):
 
     if not result:
 
@@ -68,76 +128,89 @@ def validate_token(token:str, db=Depends(get_db)):
     return {"success": True, "data": result}
 
 
-
-
-def get_current_user(token: str = Depends(oauth2_scheme),db=Depends(get_db)):
-
-
-
+def authenticate_cached(token):
+    # jwt and cache steps shared by both dependencies, returns (result, None) when they settle it
     try:
         payload = jwt.decode(token,SECRET_KEY,algorithms=[ALGORITHM])
     except jwt.ExpiredSignatureError:
-        return {"success":False, "error":"token expired"}
+        return {"success":False, "error":"token expired"}, None
     except jwt.PyJWTError:
-        return {"success":False, "error":"invalid token"}
+        return {"success":False, "error":"invalid token"}, None
 
     user_id = payload.get("user_id")
 
     if not user_id:
-        return {"success":False, "error":"user_id not found"}
-
-    token_check = validate_token(token,db)
+        return {"success":False, "error":"user_id not found"}, None
 
-    if not token_check.get("success"):
-        return {"success":False, "error":"token not valid"}
+    cached = get_cached_auth(token)
+    if cached and cached["user_id"] == user_id:
+        return {"success":True, "user":dict(cached["user"])}, None
 
     try:
         oid = ObjectId(user_id)
-    except:
-        return {"success":False, "error":"user_id invalid"}
+    except Exception:
+        return {"success":False, "error":"user_id invalid"}, None
 
+    return None, (user_id, oid)
 
-    user = db.users.find_one({"_id":oid})
-    if not user:
-        return {"success":False, "error":"user not found"}
 
-    user["_id"] = str(user["_id"])
+def authenticate_lookup(token, user_id, token_doc, user):
+    token_check = check_token(token_doc)
 
-    return {"success":True, "user":user}
+    if not token_check.get("success"):
+        return {"success":False, "error":"token not valid"}
 
+    if not user:
+        return {"success":False, "error":"user not found"}
 
+    user["_id"] = str(user["_id"])
 
-def get_active_or_new_token(user:dict,db=Depends(get_db)):
-
-    user_id = str(user["_id"])
-    now = datetime.now(timezone.utc)
+    cache_auth(token, user_id, user, token_check["data"]["expires_at"])
 
+    return {"success":True, "user":dict(user)}
 
-    existing = db.tokens.find_one({"user_id": user_id})
 
-    if existing:
+def get_current_user(token: str = Depends(oauth2_scheme),db=Depends(get_db)):
 
-        expires_at = datetime.fromtimestamp(existing["expires_at"], timezone.utc)
-        token = existing["token"]
+    result, lookup = authenticate_cached(token)
+    if result is not None:
+        return result
 
+    user_id, oid = lookup
+    return authenticate_lookup(token, user_id, db.tokens.find_one({"token":token}), db.users.find_one({"_id":oid}))
 
-        if expires_at > now:
-            return token, expires_at
 
-    new_token, expires_at = create_access_token(data=user)
-    save_token(new_token,user_id,expires_at,db)
+async def get_current_user_async(token: str = Depends(oauth2_scheme),db=Depends(get_async_db)):
 
-    return new_token,expires_at
+    result, lookup = authenticate_cached(token)
+    if result is not None:
+        return result
 
+    # the token row and the user do not depend on each other, fetch them concurrently
+    user_id, oid = lookup
+    token_doc, user = await asyncio.gather(db.tokens.find_one({"token":token}), db.users.find_one({"_id":oid}))
+    return authenticate_lookup(token, user_id, token_doc, user)
 
 
 
+async def get_active_or_new_token(user:dict,db=Depends(get_async_db)):
 
+    user_id = str(user["_id"])
+    now = datetime.now(timezone.utc)
 
 
+    existing = await db.tokens.find_one({"user_id": user_id})
 
+    if existing:
 
+        expires_at = datetime.fromtimestamp(existing["expires_at"], timezone.utc)
+        token = existing["token"]
 
 
+        if expires_at > now:
+            return token, expires_at
 
+    new_token, expires_at = create_access_token(data=user)
+    await save_token(new_token,user_id,expires_at,db)
 
+    return new_token,expires_at
@@ -2,12 +2,22 @@
 
 from fastapi import FastAPI, Depends, Request, Response, HTTPException
 from fastapi.openapi.docs import get_swagger_ui_html
+from fastapi.responses import PlainTextResponse
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from starlette.middleware.cors import CORSMiddleware
 import secrets
+import time
 from app.settings.config import SWAGGER_USER, SWAGGER_PASS
+from app.database.database import get_db, async_client
+from app.database.indexes import ensure_indexes, index_report
+from app.functions import audit_log, functions
+from app.functions.functions import start_password_pool, shutdown_password_pool
+from app.functions.response_cache import response_cache_stats
+from app.functions.token import auth_cache_stats
+from app.services.metrics import Histogram, Gauge, render_metrics
+from app.services.status_hub import status_hub
 
-from .routers import servers, contacts, auth
+from .routers import servers, contacts, auth, uptime, logs, live
 
 
 # ---------------- APP CONFIG ----------------
@@ -24,6 +34,74 @@ app = FastAPI(
 
 
 
+# ---------------- LIFECYCLE ----------------
+@app.on_event("startup")
+def on_startup():
+    # started before any background thread exists, not on the first login
+    start_password_pool()
+
+    db = get_db()
+    ensure_indexes(db)
+
+    for collection, status in index_report(db).items():
+        if status["missing"] or status["unused"]:
+            print(f"[INDEX] {collection}: {status}")
+
+    audit_log.start_writer(db)
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    audit_log.stop_writer()
+    shutdown_password_pool()
+    async_client.close()
+
+
+# ---------------- METRICS ----------------
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "API request latency per route", labels=("method", "route", "status"))
+Gauge("auth_cache_events", "Auth cache hits, misses and invalidations", labels=("event",), callback=lambda: {(k,): v for k, v in auth_cache_stats.items()})
+Gauge("response_cache_events", "Conditional GET and response cache counters", labels=("event",), callback=lambda: {(k,): v for k, v in response_cache_stats.items()})
+Gauge("audit_log_events", "Audit log queue counters", labels=("event",), callback=lambda: {(k,): v for k, v in audit_log.audit_stats.items()})
+Gauge("audit_log_queue_depth", "Audit log entries waiting to be written", callback=lambda: {(): audit_log.queue_depth()})
+Gauge("live_status_events", "Live status push counters and open subscriptions", labels=("event",), callback=lambda: {(k,): int(v) for k, v in status_hub.summary().items()})
+Gauge("password_jobs_in_flight", "Password hashing jobs queued or running", callback=lambda: {(): functions._password_jobs})
+
+
+class RequestMetricsMiddleware:
+    # plain ASGI, no extra task or stream per request and streamed responses pass straight through
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # label by route template so /servers/{server_id} stays one series
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], route.path if route else "unmatched", status)
+
+
+app.add_middleware(RequestMetricsMiddleware)
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 # ---------------- BASIC AUTH ----------------
 security = HTTPBasic()
 
@@ -63,3 +141,6 @@ app.add_middleware(
 app.include_router(servers.router)
 app.include_router(contacts.router)
 app.include_router(auth.router)
+app.include_router(uptime.router)
+app.include_router(logs.router)
+app.include_router(live.router)
@@ -1,21 +1,27 @@
-from datetime import datetime
+import asyncio
+from datetime import datetime, timezone
 from http.client import HTTPException
+from typing import Optional
 
 from bson import ObjectId
 from bson.errors import InvalidId
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
 
-from app.database.database import get_db
+from app.database.database import get_db, get_async_db
 from app.functions.functions import get_request_info, system_log
-from app.functions.token import get_current_user
+from app.functions.query import parse_projection, parse_cursor, page_limit, find_page, stream_ndjson, none
+from app.functions.response_cache import conditional_response, cached_json, bump_version
+from app.functions.token import get_current_user_async
 from app.schemas.schema import AddContact, UpdateContact
 
 router = APIRouter(tags=["Contacts"])
 
+CONTACT_FIELDS = {"email", "name", "surname", "phone", "user_id", "created_at", "updated_at", "is_active"}
+
 
 
 @router.get("/contacts/{id}", summary="Get Contact Details")
-def get_contact(contact_id: str, db= Depends(get_db), current= Depends(get_current_user), req_info=Depends(get_request_info)):
+async def get_contact(contact_id: str, request: Request, db= Depends(get_async_db), current= Depends(get_current_user_async), req_info=Depends(get_request_info)):
 
 
     user_id = current["user"]["_id"]
@@ -29,48 +35,63 @@ def get_contact(contact_id: str, db= Depends(get_db), current= Depends(get_curre
     if not current.get("success"):
         return {"success": False, "message": current.get("error", "unauthorized")}
 
-    result = db.contacts.find_one({"_id": contact_oid, "user_id":user_id})
+    etag, response = await conditional_response(request, db, user_id, "contacts")
+    if response is not None:
+        system_log(db=get_db(), log_type="get_contact", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"], "contact_id": contact_id, "cached": response.status_code})
+        return response
+
+    result = await db.contacts.find_one({"_id": contact_oid, "user_id":user_id})
 
     if not result:
         return {"success": False, "message": "Contact not found"}
 
     result["_id"] = str(result["_id"])
 
-    system_log(db=db, log_type="get_contact", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"], "data": result})
+    system_log(db=get_db(), log_type="get_contact", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"], "data": result})
 
-    return {"success": True, "message":"get data success","data": result}
+    return cached_json(etag, user_id, {"success": True, "message":"get data success","data": result})
 
 @router.get("/contacts", summary="Get All Contacts")
-def get_all_contacts(db= Depends(get_db), current= Depends(get_current_user), req_info=Depends(get_request_info)):
-
-    user_id = current["user"]["_id"]
+async def get_all_contacts(request: Request, limit: Optional[int] = None, after: Optional[str] = None, fields: Optional[str] = None, active: Optional[bool] = None, fmt: str = Query("json", alias="format"), db= Depends(get_async_db), current= Depends(get_current_user_async), req_info=Depends(get_request_info)):
 
     if not current.get("success"):
         return {"success": False, "message": current.get("error", "unauthorized")}
 
-    result = db.contacts.find({"user_id":user_id})
+    user_id = current["user"]["_id"]
+
+    query = {"user_id": user_id}
+    if active is not None:
+        query["is_active"] = active
 
-    result_list = list(result)
+    projection = parse_projection(fields, CONTACT_FIELDS)
+
+    if fmt == "ndjson":
+        system_log(db=get_db(), log_type="export_contacts", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"], "query": query})
+        return stream_ndjson(db.contacts, query, projection)
+
+    etag, response = await conditional_response(request, db, user_id, "contacts")
+    if response is not None:
+        system_log(db=get_db(), log_type="get_all_contact", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"], "cached": response.status_code})
+        return response
+
+    result_list, next_cursor = await find_page(db.contacts, query, projection, parse_cursor(after), page_limit(limit))
 
     if not result_list:
         return {"success": False, "message": "Contacts not found"}
 
-    for s in result_list:
-        s["_id"] = str(s["_id"])
+    system_log(db=get_db(), log_type="get_all_contact", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"], "count": len(result_list), "next_cursor": next_cursor})
 
-    system_log(db=db, log_type="get_all_contact", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"], "data": result_list})
-
-    return {"success": True, "message":"get all data success","data": result_list}
+    return cached_json(etag, user_id, {"success": True, "message":"get all data success","data": result_list, "next_cursor": next_cursor})
 
 @router.post("/contacts", summary="Add Contact")
-def add_contact(payload:AddContact, db = Depends(get_db), current= Depends(get_current_user), req_info=Depends(get_request_info)):
+async def add_contact(payload:AddContact, db = Depends(get_async_db), current= Depends(get_current_user_async), req_info=Depends(get_request_info)):
 
     user_id = current["user"]["_id"]
 
     if not current.get("success"):
         return {"success": False, "message": current.get("error", "unauthorized")}
 
-    exists = db.contacts.find_one({"user_id":user_id, "email":payload.email})
+    exists = await db.contacts.find_one({"user_id":user_id, "email":payload.email})
 
     if exists:
         return {"success": False, "message": "Contact already exists"}
@@ -81,12 +102,13 @@ def add_contact(payload:AddContact, db = Depends(get_db), current= Depends(get_c
         "surname": payload.surname,
         "phone": payload.phone,
         "user_id": user_id,
-        "created_at": datetime.now().strftime("%d.%m.%Y %H:%M:%S"),
-        "updated_at": datetime.now().strftime("%d.%m.%Y %H:%M:%S"),
+        "created_at": datetime.now(timezone.utc),
+        "updated_at": datetime.now(timezone.utc),
         "is_active": payload.is_active,
     }
 
-    result = db.contacts.insert_one(new_contact)
+    result = await db.contacts.insert_one(new_contact)
+    await bump_version(db, user_id, "contacts")
 
     insert_id = str(result.inserted_id)
 
@@ -94,12 +116,12 @@ def add_contact(payload:AddContact, db = Depends(get_db), current= Depends(get_c
         return {"success": False, "message": "Contact insert failed"}
 
 
-    system_log(db=db,log_type="add_contact", user_id=user_id, payload={"ip": req_info["ip"], "user_agent":req_info["user_agent"], "data":new_contact, "insert_id": insert_id})
+    system_log(db=get_db(),log_type="add_contact", user_id=user_id, payload={"ip": req_info["ip"], "user_agent":req_info["user_agent"], "data":new_contact, "insert_id": insert_id})
 
     return {"success":True,"message": "Contact Added","insert_id": insert_id}
 
 @router.put("/contacts/{id}", summary="Update Contact")
-def update_contact(contact_id:str,payload:UpdateContact, db = Depends(get_db), current= Depends(get_current_user), req_info=Depends(get_request_info) ):
+async def update_contact(contact_id:str,payload:UpdateContact, db = Depends(get_async_db), current= Depends(get_current_user_async), req_info=Depends(get_request_info) ):
 
     user_id = current["user"]["_id"]
 
@@ -111,32 +133,31 @@ def update_contact(contact_id:str,payload:UpdateContact, db = Depends(get_db), c
     if not current.get("success"):
         return {"success": False, "message": current.get("error", "unauthorized")}
 
-    check_data = db.contacts.find_one({"user_id":user_id, "_id":contact_oid})
-
-    if not check_data:
-        return {"success": False, "message": "Contact not found"}
-
-
     update_data = payload.model_dump(exclude_unset=True)
 
+    check_data, exists = await asyncio.gather(
+        db.contacts.find_one({"user_id":user_id, "_id":contact_oid}, {"_id": 1}),
+        db.contacts.find_one({"user_id":user_id, "email":payload.email, "_id":{"$ne":contact_oid}}, {"_id": 1}) if "email" in update_data else none(),
+    )
 
-    if "email" in update_data:
+    if not check_data:
+        return {"success": False, "message": "Contact not found"}
 
-        exists = db.contacts.find_one({"user_id":user_id, "email":payload.email, "_id":{"$ne":contact_oid}})
-        if exists:
-            return {"success": False, "message": "Contact already exists"}
+    if exists:
+        return {"success": False, "message": "Contact already exists"}
 
     update_data = {k: v for k, v in update_data.items() if v not in ("", None)}
-    update_data["updated_at"] = datetime.now().strftime("%d.%m.%Y %H:%M:%S")
+    update_data["updated_at"] = datetime.now(timezone.utc)
 
-    db.contacts.update_one({"_id": contact_oid, "user_id": user_id},{"$set": update_data})
+    await db.contacts.update_one({"_id": contact_oid, "user_id": user_id},{"$set": update_data})
+    await bump_version(db, user_id, "contacts")
 
-    system_log(db=db, log_type="update_contact", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"],    "data": payload.model_dump(), "contact_oid": contact_oid})
+    system_log(db=get_db(), log_type="update_contact", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"],    "data": payload.model_dump(), "contact_oid": contact_oid})
 
     return {"success": True, "message": "Contact Updated", "data": update_data}
 
 @router.delete("/contacts/{id}", summary="Delete Contact")
-def delete_contact(contact_id:str, db = Depends(get_db),current= Depends(get_current_user), req_info=Depends(get_request_info)):
+async def delete_contact(contact_id:str, db = Depends(get_async_db),current= Depends(get_current_user_async), req_info=Depends(get_request_info)):
 
     user_id = current["user"]["_id"]
 
@@ -148,13 +169,12 @@ def delete_contact(contact_id:str, db = Depends(get_db),current= Depends(get_cur
     if not current.get("success"):
         return {"success": False, "message": current.get("error", "unauthorized")}
 
-    result = db.contacts.find_one({"_id": contact_oid, "user_id":user_id})
+    result = await db.contacts.delete_one({"_id": contact_oid, "user_id": user_id})
 
-    if not result:
+    if not result.deleted_count:
         return {"success": False, "message": "Contact not found"}
+    await bump_version(db, user_id, "contacts")
 
-    db.contacts.delete_one({"_id": contact_oid, "user_id": user_id})
-
-    system_log(db=db, log_type="delete_contact", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"], "contact_oid": contact_oid})
+    system_log(db=get_db(), log_type="delete_contact", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"], "contact_oid": contact_oid})
 
     return {"success": True, "message": "Contact Deleted"}
\ No newline at end of file
@@ -0,0 +1,110 @@
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.database.database import get_db
+from app.functions.functions import system_log, get_request_info
+from app.functions.token import get_current_user
+from app.services.status_hub import EVENT_FIELDS, status_event, status_hub
+from app.settings.config import LIVE_KEEPALIVE_INTERVAL
+
+router = APIRouter(tags=["Live"])
+
+
+def bearer_token(headers, token):
+    # browsers cannot set headers on EventSource or WebSocket, so ?token= is accepted too
+    authorization = headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        return authorization[7:]
+    return token
+
+
+async def authenticate(headers, token, db):
+    token = bearer_token(headers, token)
+    if not token:
+        return {"success": False, "error": "not authenticated"}
+    return await run_in_threadpool(get_current_user, token, db)
+
+
+async def load_snapshot(db, user_id):
+    servers = await run_in_threadpool(lambda: list(db.servers.find({"user_id": user_id}, EVENT_FIELDS)))
+    return [status_event(server) for server in servers]
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.get("/live/servers", summary="Stream status changes of your servers (Server-Sent Events)")
+async def stream_server_status(request: Request, token: Optional[str] = None, snapshot: bool = True, db=Depends(get_db), req_info=Depends(get_request_info)):
+    current = await authenticate(request.headers, token, db)
+
+    if not current.get("success"):
+        return {"success": False, "message": current.get("error", "unauthorized")}
+
+    user_id = current["user"]["_id"]
+    subscription = status_hub.subscribe(db, user_id)
+    initial = await load_snapshot(db, user_id) if snapshot else None
+    system_log(db=db, log_type="live_servers", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"], "transport": "sse"})
+
+    async def generate():
+        try:
+            if initial is not None:
+                yield sse("snapshot", initial)
+
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), LIVE_KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+
+                if event is None:
+                    break
+
+                yield sse("status", event)
+        finally:
+            status_hub.unsubscribe(subscription)
+
+    return StreamingResponse(generate(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.websocket("/live/servers/ws")
+async def stream_server_status_ws(websocket: WebSocket, token: Optional[str] = None, snapshot: bool = True, db=Depends(get_db)):
+    current = await authenticate(websocket.headers, token, db)
+
+    if not current.get("success"):
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+
+    user_id = current["user"]["_id"]
+    subscription = status_hub.subscribe(db, user_id)
+    system_log(db=db, log_type="live_servers", user_id=user_id, payload={"ip": websocket.client.host if websocket.client else "unknown", "user_agent": websocket.headers.get("user-agent"), "transport": "websocket"})
+
+    try:
+        if snapshot:
+            await websocket.send_json({"type": "snapshot", "servers": await load_snapshot(db, user_id)})
+
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), LIVE_KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                await websocket.send_json({"type": "ping"})
+                continue
+
+            if event is None:
+                # fell too far behind, the client should reconnect for a fresh snapshot
+                await websocket.close(code=1013)
+                break
+
+            await websocket.send_json({"type": "status", **event})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        status_hub.unsubscribe(subscription)
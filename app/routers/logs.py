@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from bson import ObjectId
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
+
+from app.database.database import get_db
+from app.functions.functions import system_log, get_request_info
+from app.functions.token import get_current_user
+from app.settings.config import LOG_QUERY_MAX_LIMIT
+
+router = APIRouter(tags=["Logs"])
+
+
+def time_range(start, end):
+    end = end or datetime.now(timezone.utc)
+    end = end if end.tzinfo else end.replace(tzinfo=timezone.utc)
+    start = start or end - timedelta(hours=1)
+    start = start if start.tzinfo else start.replace(tzinfo=timezone.utc)
+
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    return {"$gte": start, "$lt": end}
+
+
+def find_logs(collection, query, limit):
+    limit = max(1, min(limit, LOG_QUERY_MAX_LIMIT))
+    logs = list(collection.find(query).sort("timestamp", -1).limit(limit))
+
+    # audit payloads can hold ObjectIds anywhere, not only in _id
+    return jsonable_encoder(logs, custom_encoder={ObjectId: str})
+
+
+@router.get("/logs/monitor", summary="Monitor logs by time range")
+def get_monitor_logs(start: Optional[datetime] = None, end: Optional[datetime] = None, log_type: Optional[str] = None, server_id: Optional[str] = None, limit: int = 100, db=Depends(get_db), current=Depends(get_current_user), req_info=Depends(get_request_info)):
+
+    if not current.get("success"):
+        return {"success": False, "message": current.get("error", "unauthorized")}
+
+    user_id = current["user"]["_id"]
+
+    if server_id:
+        try:
+            server_oid = ObjectId(server_id)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid server_id")
+
+        if not db.servers.find_one({"_id": server_oid, "user_id": user_id}, {"_id": 1}):
+            raise HTTPException(status_code=404, detail="Server not found")
+
+        query = {"server_id": server_id, "timestamp": time_range(start, end)}
+    else:
+        query = {"user_id": user_id, "timestamp": time_range(start, end)}
+
+    if log_type:
+        query["log_type"] = log_type
+
+    logs = find_logs(db.monitor_logs, query, limit)
+
+    system_log(db=db, log_type="get_monitor_logs", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"], "count": len(logs)})
+
+    return {"success": True, "message": "get logs success", "data": logs}
+
+
+@router.get("/logs/system", summary="System logs by time range")
+def get_system_logs(start: Optional[datetime] = None, end: Optional[datetime] = None, log_type: Optional[str] = None, limit: int = 100, db=Depends(get_db), current=Depends(get_current_user), req_info=Depends(get_request_info)):
+
+    if not current.get("success"):
+        return {"success": False, "message": current.get("error", "unauthorized")}
+
+    user_id = current["user"]["_id"]
+
+    query = {"user_id": user_id, "timestamp": time_range(start, end)}
+    if log_type:
+        query["type"] = log_type
+
+    logs = find_logs(db.system_logs, query, limit)
+
+    return {"success": True, "message": "get logs success", "data": logs}
@@ -1,18 +1,85 @@
-from datetime import datetime
+import asyncio
+import csv
+import io
+from datetime import datetime, timezone
+from typing import Optional
 
 from bson import ObjectId
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, File
+from pydantic import ValidationError
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from starlette.concurrency import run_in_threadpool
 
-from app.database.database import get_db
+from app.database.database import get_db, get_async_db
 from app.functions.functions import system_log, get_request_info
-from app.functions.token import get_current_user
-from app.schemas.schema import AddServer, UpdateServer
+from app.functions.query import parse_projection, parse_cursor, page_limit, find_page, stream_ndjson, none
+from app.functions.response_cache import conditional_response, cached_json, bump_version
+from app.functions.token import get_current_user_async
+from app.schemas.schema import AddServer, UpdateServer, BulkServers
+from app.settings.config import BULK_MAX_ROWS
 
 router = APIRouter(tags=["Servers"])
 
+SERVER_FIELDS = {
+    "name", "host", "protocol", "port", "user_id", "expected_status", "retry_count", "alert_interval", "check_interval", "timeout",
+    "description", "contacts", "send", "expect", "created_at", "updated_at", "is_active", "state", "state_changed_at", "status_changed_at", "last_status", "last_checked_at", "last_alert_at",
+}
+
+HEALTH_STATES = {"UP", "DEGRADED", "DOWN", "FLAPPING"}
+
+PROTOCOLS = {"http", "https", "icmp", "tcp"}
+
+
+async def resolve_contacts(db, user_id, contact_ids):
+    oids = []
+    for contact_id in contact_ids:
+        try:
+            oids.append(ObjectId(contact_id))
+        except Exception:
+            continue
+
+    if not oids:
+        return {}
+
+    contacts = await db.contacts.find({"_id": {"$in": oids}, "user_id": user_id}, {"email": 1}).to_list(None)
+    return {str(c["_id"]): c["email"] for c in contacts}
+
+
+def contact_emails(contact_ids, contacts_map):
+    return [contacts_map[c] for c in contact_ids if c in contacts_map]
+
+
+def build_server_doc(info, user_id, contacts_map):
+    return {
+        "name": info.name,
+        "host": info.host,
+        "protocol": info.protocol.lower(),
+        "port": info.port,
+        "user_id": user_id,
+        "expected_status": info.expected_status,
+        "retry_count": info.retry_count,
+        "alert_interval":info.alert_interval,
+        "check_interval": info.check_interval,
+        "timeout": info.timeout,
+        "description": info.description,
+        "contacts": contact_emails(info.contacts, contacts_map),
+        "send": info.send,
+        "expect": info.expect,
+        "created_at": datetime.now(timezone.utc),
+        "updated_at": datetime.now(timezone.utc),
+        "is_active": info.is_active,
+        "state": None,
+        "state_changed_at": None,
+        "status_changed_at": None,
+        "last_status": None,
+        "last_checked_at": None,
+        "last_alert_at": None,
+    }
+
 
 @router.get("/servers/{server_id}",  summary= "Get server")
-def get_server(server_id: str, db= Depends(get_db),current = Depends(get_current_user),req_info=Depends(get_request_info)):
+async def get_server(server_id: str, request: Request, db= Depends(get_async_db),current = Depends(get_current_user_async),req_info=Depends(get_request_info)):
 
     if not current.get("success"):
         return {"success": False, "message": current.get("error", "unauthorized")}
@@ -24,94 +91,224 @@ def get_server(server_id: str, db= Depends(get_db),current = Depends(get_current
 
     user_id = current["user"]["_id"]
 
-    result = db.servers.find_one({"_id": server_oid, "user_id": user_id})
+    etag, response = await conditional_response(request, db, user_id, "servers")
+    if response is not None:
+        system_log(db=get_db(),log_type="get_server",user_id=user_id,  payload={"ip": req_info["ip"], "user_agent":req_info["user_agent"], "server_id": server_id, "cached": response.status_code} )
+        return response
+
+    result = await db.servers.find_one({"_id": server_oid, "user_id": user_id})
 
     if not result:
         raise HTTPException(status_code=404, detail="Server not found")
 
     result["_id"] = str(result["_id"])
 
-    system_log(db=db,log_type="get_server",user_id=user_id,  payload={"ip": req_info["ip"], "user_agent":req_info["user_agent"], "data":result} )
+    system_log(db=get_db(),log_type="get_server",user_id=user_id,  payload={"ip": req_info["ip"], "user_agent":req_info["user_agent"], "data":result} )
 
-    return {"success": True,"message":"get data success","data": result}
+    return cached_json(etag, user_id, {"success": True,"message":"get data success","data": result})
 
 
 @router.get("/servers", summary= "Get all servers")
-def get_all_servers(db= Depends(get_db),current=Depends(get_current_user), req_info=Depends(get_request_info)):
+async def get_all_servers(request: Request, limit: Optional[int] = None, after: Optional[str] = None, fields: Optional[str] = None, status: Optional[str] = None, protocol: Optional[str] = None, active: Optional[bool] = None, fmt: str = Query("json", alias="format"), db= Depends(get_async_db),current=Depends(get_current_user_async), req_info=Depends(get_request_info)):
 
     if not current.get("success"):
         return {"success": False, "message": current.get("error", "unauthorized")}
 
     user_id = current["user"]["_id"]
 
-    servers = list(db.servers.find({"user_id": user_id}))
+    query = {"user_id": user_id}
+    if status:
+        # worker health states filter on state, OK/FAIL keep filtering on last_status
+        query["state" if status.upper() in HEALTH_STATES else "last_status"] = status.upper()
+    if protocol:
+        query["protocol"] = protocol.lower()
+    if active is not None:
+        query["is_active"] = active
 
-    if not servers:
-        return {"success": True, "message": "servers not found", "data": []}
+    projection = parse_projection(fields, SERVER_FIELDS)
+
+    if fmt == "ndjson":
+        system_log(db=get_db(), log_type="export_servers", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"], "query": query})
+        return stream_ndjson(db.servers, query, projection)
+
+    etag, response = await conditional_response(request, db, user_id, "servers")
+    if response is not None:
+        system_log(db=get_db(), log_type="get_all_server", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"], "cached": response.status_code})
+        return response
 
-    system_log(db=db, log_type="get_all_server", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"], "data": servers})
+    servers, next_cursor = await find_page(db.servers, query, projection, parse_cursor(after), page_limit(limit))
 
-    for s in servers:
-        s["_id"] = str(s["_id"])
+    if not servers:
+        return cached_json(etag, user_id, {"success": True, "message": "servers not found", "data": [], "next_cursor": None})
+
+    system_log(db=get_db(), log_type="get_all_server", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"], "count": len(servers), "next_cursor": next_cursor})
 
-    return {"success": True, "message": "get all data success", "data": servers}
+    return cached_json(etag, user_id, {"success": True, "message": "get all data success", "data": servers, "next_cursor": next_cursor})
 
 
 @router.post("/servers", summary="Add Server")
-def add_server(info: AddServer, db=Depends(get_db),current = Depends(get_current_user),req_info=Depends(get_request_info)):
+async def add_server(info: AddServer, db=Depends(get_async_db),current = Depends(get_current_user_async),req_info=Depends(get_request_info)):
 
     if not current.get("success"):
         return {"success": False, "message": current.get("error", "unauthorized")}
 
     user_id = current["user"]["_id"]
 
-    exists = db.servers.find_one({"host": info.host, "user_id": user_id})
+    if info.protocol.lower() not in PROTOCOLS:
+        raise HTTPException(status_code=400, detail=f"protocol must be one of {', '.join(sorted(PROTOCOLS))}")
+
+    exists, contacts_map = await asyncio.gather(db.servers.find_one({"host": info.host, "user_id": user_id}, {"_id": 1}), resolve_contacts(db, user_id, info.contacts))
 
     if exists:
         raise HTTPException(status_code=400, detail="Server already exists")
 
 
-    contacts_emails = []
+    payload = build_server_doc(info, user_id, contacts_map)
 
+    result = await db.servers.insert_one(payload)
+    insert_id = str(result.inserted_id)
+    await bump_version(db, user_id, "servers")
 
+    system_log(db=get_db(),log_type="add_server", user_id=user_id, payload={"ip": req_info["ip"], "user_agent":req_info["user_agent"], "data":payload, "insert_id": insert_id})
 
-    for contact_id in info.contacts:
-        contact =  db.contacts.find_one({"_id":ObjectId(contact_id), "user_id": user_id })
+    return {"success":True,"message": "Server Added","insert_id": insert_id}
 
-        if contact:
-            contacts_emails.append(contact["email"])
 
+async def import_servers(db, user_id, rows, on_conflict):
+    if on_conflict not in ("error", "skip", "update"):
+        raise HTTPException(status_code=400, detail="on_conflict must be error, skip or update")
+
+    if len(rows) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_MAX_ROWS} servers per request")
+
+    errors = []
+    valid = []
+    seen_hosts = set()
+
+    for index, row in enumerate(rows):
+        try:
+            info = AddServer.model_validate(row)
+        except ValidationError as e:
+            errors.append({"row": index, "error": "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())})
+            continue
+
+        if info.protocol.lower() not in PROTOCOLS:
+            errors.append({"row": index, "error": f"protocol must be one of {', '.join(sorted(PROTOCOLS))}"})
+            continue
+
+        if info.host in seen_hosts:
+            errors.append({"row": index, "error": f"duplicate host {info.host} in request"})
+            continue
+
+        seen_hosts.add(info.host)
+        valid.append((index, info))
+
+    contacts_map, existing_docs = await asyncio.gather(
+        resolve_contacts(db, user_id, {c for _, info in valid for c in info.contacts}),
+        db.servers.find({"user_id": user_id, "host": {"$in": list(seen_hosts)}}, {"host": 1}).to_list(None),
+    )
+    existing = {s["host"]: s["_id"] for s in existing_docs}
+
+    operations = []
+    op_rows = []
+    op_docs = []
+    skipped = 0
+
+    for index, info in valid:
+        doc = build_server_doc(info, user_id, contacts_map)
+
+        if info.host not in existing:
+            operations.append(InsertOne(doc))
+        elif on_conflict == "update":
+            for field in ("created_at", "state", "state_changed_at", "status_changed_at", "last_status", "last_checked_at", "last_alert_at"):
+                doc.pop(field)
+            operations.append(UpdateOne({"_id": existing[info.host], "user_id": user_id}, {"$set": doc}))
+        elif on_conflict == "skip":
+            skipped += 1
+            continue
+        else:
+            errors.append({"row": index, "error": f"server {info.host} already exists"})
+            continue
+
+        op_rows.append(index)
+        op_docs.append(doc)
+
+    failed_ops = set()
+
+    if operations:
+        try:
+            await db.servers.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            for err in e.details.get("writeErrors", []):
+                failed_ops.add(err["index"])
+                errors.append({"row": op_rows[err["index"]], "error": err.get("errmsg")})
+
+    inserted = {}
+    updated = 0
+
+    for op_index, operation in enumerate(operations):
+        if op_index in failed_ops:
+            continue
+        if isinstance(operation, InsertOne):
+            inserted[op_rows[op_index]] = str(op_docs[op_index]["_id"])
+        else:
+            updated += 1
+
+    if len(failed_ops) < len(operations):
+        await bump_version(db, user_id, "servers")
+
+    errors.sort(key=lambda e: e["row"])
+    return {"inserted": len(inserted), "updated": updated, "skipped": skipped, "failed": len(errors), "insert_ids": inserted, "errors": errors}
+
+
+@router.post("/servers/bulk", summary="Bulk import servers")
+async def bulk_import_servers(info: BulkServers, db=Depends(get_async_db), current=Depends(get_current_user_async), req_info=Depends(get_request_info)):
 
-    payload = {
-        "name": info.name,
-        "host": info.host,
-        "protocol": info.protocol,
-        "port": info.port,
-        "user_id": user_id,
-        "expected_status": info.expected_status,
-        "retry_count": info.retry_count,
-        "alert_interval":info.alert_interval,
-        "description": info.description,
-        "contacts": contacts_emails,
-        "created_at": datetime.now().strftime("%d.%m.%Y %H:%M:%S"),
-        "updated_at": datetime.now().strftime("%d.%m.%Y %H:%M:%S"),
-        "is_active": info.is_active,
-        "last_status": None,
-        "last_checked_at": None,
-        "last_alert_at": None,
+    if not current.get("success"):
+        return {"success": False, "message": current.get("error", "unauthorized")}
 
-    }
+    user_id = current["user"]["_id"]
 
-    result = db.servers.insert_one(payload)
-    insert_id = str(result.inserted_id)
+    result = await import_servers(db, user_id, info.servers, info.on_conflict)
 
-    system_log(db=db,log_type="add_server", user_id=user_id, payload={"ip": req_info["ip"], "user_agent":req_info["user_agent"], "data":payload, "insert_id": insert_id})
+    system_log(db=get_db(), log_type="bulk_import_servers", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"], "rows": len(info.servers), "inserted": result["inserted"], "updated": result["updated"], "failed": result["failed"]})
 
-    return {"success":True,"message": "Server Added","insert_id": insert_id}
+    return {"success": True, "message": "Bulk import finished", "data": result}
+
+
+def read_csv_rows(file):
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig"))
+    rows = []
+    for row in reader:
+        row = {k.strip(): v.strip() for k, v in row.items() if k and v not in (None, "")}
+        row["contacts"] = [c.strip() for c in row.get("contacts", "").split(";") if c.strip()]
+        rows.append(row)
+    return rows
+
+
+@router.post("/servers/bulk/csv", summary="Bulk import servers from CSV")
+async def bulk_import_servers_csv(file: UploadFile = File(...), on_conflict: str = "error", db=Depends(get_async_db), current=Depends(get_current_user_async), req_info=Depends(get_request_info)):
+
+    if not current.get("success"):
+        return {"success": False, "message": current.get("error", "unauthorized")}
+
+    user_id = current["user"]["_id"]
+
+    try:
+        # the upload is a spooled file, parse it off the event loop
+        rows = await run_in_threadpool(read_csv_rows, file.file)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid CSV file: {e}")
+
+    result = await import_servers(db, user_id, rows, on_conflict)
+
+    system_log(db=get_db(), log_type="bulk_import_servers", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"], "rows": len(rows), "inserted": result["inserted"], "updated": result["updated"], "failed": result["failed"]})
+
+    return {"success": True, "message": "Bulk import finished", "data": result}
 
 
 @router.put("/servers/{server_id}", summary= "Update server")
-def update_server(server_id:str, payload:UpdateServer , db = Depends(get_db), current = Depends(get_current_user), req_info=Depends(get_request_info)):
+async def update_server(server_id:str, payload:UpdateServer , db = Depends(get_async_db), current = Depends(get_current_user_async), req_info=Depends(get_request_info)):
 
     if not current.get("success"):
         return {"success": False, "message": current.get("error", "unauthorized")}
@@ -123,39 +320,43 @@ def update_server(server_id:str, payload:UpdateServer , db = Depends(get_db), cu
 
     user_id = current["user"]["_id"]
 
-    result = db.servers.find_one({"_id": server_oid, "user_id": user_id})
+    update_data = payload.model_dump(exclude_unset=True)
+
+    # ownership, host clash and contact lookups are independent, run them together
+    result, exists, contacts_map = await asyncio.gather(
+        db.servers.find_one({"_id": server_oid, "user_id": user_id}, {"_id": 1}),
+        db.servers.find_one({"host": update_data["host"], "user_id": user_id, "_id":{"$ne":server_oid}}, {"_id": 1}) if "host" in update_data else none(),
+        resolve_contacts(db, user_id, update_data["contacts"]) if update_data.get("contacts") is not None else none(),
+    )
+
     if not result:
         raise HTTPException(status_code=404, detail="Server not found")
 
-    update_data = payload.model_dump(exclude_unset=True)
+    if update_data.get("contacts") is not None:
+        update_data["contacts"] = contact_emails(update_data["contacts"], contacts_map)
 
-    if "contacts" in update_data:
-        contacts_emails = []
-        for contact_id in update_data["contacts"]:
-            contact = db.contacts.find_one({"_id": ObjectId(contact_id), "user_id": user_id})
-            if contact:
-                contacts_emails.append(contact.get("email"))
-        update_data["contacts"] = contacts_emails
+    if update_data.get("protocol"):
+        update_data["protocol"] = update_data["protocol"].lower()
+        if update_data["protocol"] not in PROTOCOLS:
+            raise HTTPException(status_code=400, detail=f"protocol must be one of {', '.join(sorted(PROTOCOLS))}")
 
-    if "host" in update_data:
-        exists = db.servers.find_one({"host": update_data["host"], "user_id": user_id, "_id":{"$ne":server_oid}})
-
-        if exists:
-            raise HTTPException(status_code=400, detail="Server already exists")
+    if exists:
+        raise HTTPException(status_code=400, detail="Server already exists")
 
     update_data = {k: v for k, v in update_data.items() if v not in ("", None)}
-    update_data["updated_at"] = datetime.now().strftime("%d.%m.%Y %H:%M:%S")
+    update_data["updated_at"] = datetime.now(timezone.utc)
 
-    db.servers.update_one({"_id": server_oid, "user_id": user_id},{"$set": update_data})
+    await db.servers.update_one({"_id": server_oid, "user_id": user_id},{"$set": update_data})
+    await bump_version(db, user_id, "servers")
 
-    system_log(db=db, log_type="update_server", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"],    "data": payload.model_dump(), "server_oid": server_oid})
+    system_log(db=get_db(), log_type="update_server", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"],    "data": payload.model_dump(), "server_oid": server_oid})
 
     return {"success": True, "message": "Server Updated", "data": update_data}
 
 
 
 @router.delete("/servers/{server_id}", summary= "Delete server")
-def delete_server(server_id:str, db = Depends(get_db), current = Depends(get_current_user), req_info=Depends(get_request_info)):
+async def delete_server(server_id:str, db = Depends(get_async_db), current = Depends(get_current_user_async), req_info=Depends(get_request_info)):
 
     if not current.get("success"):
         return {"success": False, "message": current.get("error", "unauthorized")}
@@ -167,12 +368,12 @@ def delete_server(server_id:str, db = Depends(get_db), current = Depends(get_cur
 
     user_id = current["user"]["_id"]
 
-    result = db.servers.find_one({"_id": server_oid, "user_id": user_id})
-    if not result:
+    result = await db.servers.delete_one({"_id": server_oid, "user_id": user_id})
+    if not result.deleted_count:
         raise HTTPException(status_code=404, detail="Server not found")
 
-    db.servers.delete_one({"_id": server_oid, "user_id": user_id})
+    await bump_version(db, user_id, "servers")
 
-    system_log(db=db, log_type="delete_server", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"], "server_oid": server_oid})
+    system_log(db=get_db(), log_type="delete_server", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"], "server_oid": server_oid})
 
     return {"success": True, "message": "Server Deleted"}
\ No newline at end of file
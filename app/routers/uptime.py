@@ -0,0 +1,102 @@
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from bson import ObjectId
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.database.database import get_db
+from app.functions.functions import system_log, get_request_info
+from app.functions.token import get_current_user
+from app.services.check_history import summarize_rollups
+from app.settings.config import UPTIME_CACHE_TTL
+
+router = APIRouter(tags=["Uptime"])
+
+WINDOWS = {
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30),
+}
+
+_report_cache = {}
+
+
+def resolve_range(window, start, end):
+    if start is None:
+        if window not in WINDOWS:
+            raise HTTPException(status_code=400, detail=f"window must be one of {', '.join(WINDOWS)}")
+        end = datetime.now(timezone.utc)
+        return end - WINDOWS[window], end
+
+    start = start if start.tzinfo else start.replace(tzinfo=timezone.utc)
+    end = end or datetime.now(timezone.utc)
+    end = end if end.tzinfo else end.replace(tzinfo=timezone.utc)
+
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    return start, end
+
+
+def cached_report(db, match, start, end, cache_key):
+    # named windows are what dashboards poll, serve them from memory for a short while
+    if cache_key is None:
+        return summarize_rollups(db, match, start, end)
+
+    cached = _report_cache.get(cache_key)
+    now = time.monotonic()
+
+    if cached and cached[0] > now:
+        return cached[1]
+
+    report = summarize_rollups(db, match, start, end)
+
+    if len(_report_cache) > 10000:
+        _report_cache.clear()
+    _report_cache[cache_key] = (now + UPTIME_CACHE_TTL, report)
+    return report
+
+
+@router.get("/uptime", summary="Uptime and latency report for all servers")
+def get_uptime(window: str = "24h", start: Optional[datetime] = None, end: Optional[datetime] = None, db=Depends(get_db), current=Depends(get_current_user), req_info=Depends(get_request_info)):
+
+    if not current.get("success"):
+        return {"success": False, "message": current.get("error", "unauthorized")}
+
+    user_id = current["user"]["_id"]
+    cache_key = (user_id, None, window) if start is None else None
+    start, end = resolve_range(window, start, end)
+
+    report = cached_report(db, {"user_id": user_id}, start, end, cache_key)
+
+    system_log(db=db, log_type="get_uptime", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"], "window": window})
+
+    return {"success": True, "message": "get uptime success", "data": report}
+
+
+@router.get("/servers/{server_id}/uptime", summary="Uptime and latency report for a server")
+def get_server_uptime(server_id: str, window: str = "24h", start: Optional[datetime] = None, end: Optional[datetime] = None, db=Depends(get_db), current=Depends(get_current_user), req_info=Depends(get_request_info)):
+
+    if not current.get("success"):
+        return {"success": False, "message": current.get("error", "unauthorized")}
+
+    try:
+        server_oid = ObjectId(server_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid server_id")
+
+    user_id = current["user"]["_id"]
+
+    if not db.servers.find_one({"_id": server_oid, "user_id": user_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Server not found")
+
+    cache_key = (user_id, server_id, window) if start is None else None
+    start, end = resolve_range(window, start, end)
+
+    report = cached_report(db, {"server_id": server_oid}, start, end, cache_key)
+    report = {"granularity": report["granularity"], "start": report["start"], "end": report["end"], "server": report["overall"]}
+
+    system_log(db=db, log_type="get_server_uptime", user_id=user_id, payload={"ip": req_info["ip"], "user_agent": req_info["user_agent"], "server_id": server_id, "window": window})
+
+    return {"success": True, "message": "get uptime success", "data": report}
@@ -10,9 +10,13 @@ class AddServer(BaseModel):
     expected_status: str
     retry_count: int
     alert_interval: int
+    check_interval: int = 30
+    timeout: int = 5
     is_active: bool = True
     contacts: List[str]
     description: str
+    send: Optional[str] = None
+    expect: Optional[str] = None
 
 
 class UpdateServer(BaseModel):
@@ -23,12 +27,21 @@ class UpdateServer(BaseModel):
     expected_status: Optional[str] = None
     retry_count: Optional[int] = None
     alert_interval: Optional[int] = None
+    check_interval: Optional[int] = None
+    timeout: Optional[int] = None
     is_active: Optional[bool] = None
     contacts: Optional[List[str]] = None
     description: Optional[str] = None
+    send: Optional[str] = None
+    expect: Optional[str] = None
 
 
 
+class BulkServers(BaseModel):
+    servers: List[dict]
+    on_conflict: str = "error"
+
+
 class RegisterUser(BaseModel):
     username: str
     email: str
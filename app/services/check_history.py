@@ -0,0 +1,213 @@
+from bisect import bisect_left
+from datetime import timedelta
+
+from pymongo import ASCENDING
+from pymongo.errors import CollectionInvalid
+
+from app.settings.config import HISTORY_RAW_TTL_DAYS, HISTORY_MINUTE_TTL_DAYS, HISTORY_HOUR_TTL_DAYS
+
+CHECK_RESULTS = "check_results"
+
+ROLLUP_COLLECTIONS = {
+    "minute": "check_rollups_minute",
+    "hour": "check_rollups_hour",
+    "day": "check_rollups_day",
+}
+
+ROLLUP_TTL_DAYS = {
+    "minute": HISTORY_MINUTE_TTL_DAYS,
+    "hour": HISTORY_HOUR_TTL_DAYS,
+    "day": None,
+}
+
+# upper bounds in ms, the last bucket collects everything slower
+LATENCY_BUCKETS = [5, 10, 25, 50, 75, 100, 150, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000]
+
+
+def latency_bucket(latency_ms):
+    return bisect_left(LATENCY_BUCKETS, latency_ms)
+
+
+def percentile_from_hist(hist, q):
+    total = sum(hist.values())
+    if not total:
+        return None
+
+    rank = total * q
+    seen = 0
+    for index in sorted(hist, key=int):
+        seen += hist[index]
+        if seen >= rank:
+            index = int(index)
+            return LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else LATENCY_BUCKETS[-1]
+
+    return LATENCY_BUCKETS[-1]
+
+
+def bucket_start(timestamp, granularity):
+    if granularity == "minute":
+        return timestamp.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def ensure_history_collections(db):
+    try:
+        db.create_collection(
+            CHECK_RESULTS,
+            timeseries={"timeField": "timestamp", "metaField": "meta", "granularity": "seconds"},
+            expireAfterSeconds=int(timedelta(days=HISTORY_RAW_TTL_DAYS).total_seconds()),
+        )
+    except CollectionInvalid:
+        pass
+
+    db[CHECK_RESULTS].create_index([("meta.server_id", ASCENDING), ("timestamp", ASCENDING)])
+
+    for granularity, name in ROLLUP_COLLECTIONS.items():
+        collection = db[name]
+        collection.create_index([("server_id", ASCENDING), ("bucket", ASCENDING)], unique=True)
+        collection.create_index([("user_id", ASCENDING), ("bucket", ASCENDING)])
+
+        ttl_days = ROLLUP_TTL_DAYS[granularity]
+        if ttl_days:
+            collection.create_index("bucket", expireAfterSeconds=int(timedelta(days=ttl_days).total_seconds()))
+
+
+def rollup_increments(result):
+    inc = {"count": 1, "ok": 1 if result["status"] == "OK" else 0, "fail": 0 if result["status"] == "OK" else 1}
+
+    if result.get("incident"):
+        inc["incidents"] = 1
+
+    if result.get("error"):
+        inc[f"errors.{result['error']}"] = 1
+
+    latency = result.get("latency_ms")
+    if latency is not None:
+        inc["latency_count"] = 1
+        inc["latency_sum"] = latency
+        inc[f"latency_hist.{latency_bucket(latency)}"] = 1
+
+    return inc
+
+
+def rollup_granularity(start, end):
+    span = end - start
+    if span <= timedelta(hours=6):
+        return "minute"
+    if span <= timedelta(days=3):
+        return "hour"
+    return "day"
+
+
+BUCKET_SIZE = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1), "day": timedelta(days=1)}
+FINER = {"day": "hour", "hour": "minute"}
+
+SUM_FIELDS = ["count", "ok", "fail", "incidents", "latency_count", "latency_sum"]
+
+
+def bucket_ceil(timestamp, granularity):
+    start = bucket_start(timestamp, granularity)
+    return start if start == timestamp else start + BUCKET_SIZE[granularity]
+
+
+def rollup_segments(start, end, granularity):
+    # whole buckets of the coarse granularity, the ragged edges from the next finer one
+    if start >= end:
+        return []
+
+    if granularity == "minute":
+        return [("minute", bucket_ceil(start, "minute"), end)]
+
+    inner_start, inner_end = bucket_ceil(start, granularity), bucket_start(end, granularity)
+    if inner_start >= inner_end:
+        return rollup_segments(start, end, FINER[granularity])
+
+    return rollup_segments(start, inner_start, FINER[granularity]) + [(granularity, inner_start, inner_end)] + rollup_segments(inner_end, end, FINER[granularity])
+
+
+def aggregate_rollups(collection, match, totals, hists):
+    rows = collection.aggregate([
+        {"$match": match},
+        {"$group": {
+            "_id": "$server_id",
+            **{field: {"$sum": f"${field}"} for field in SUM_FIELDS},
+            "latency_min": {"$min": "$latency_min"},
+            "latency_max": {"$max": "$latency_max"},
+        }},
+    ])
+
+    for row in rows:
+        server_id = row.pop("_id")
+        total = totals.setdefault(server_id, {field: 0 for field in SUM_FIELDS})
+        for field in SUM_FIELDS:
+            total[field] += row.get(field) or 0
+        for field, pick in (("latency_min", min), ("latency_max", max)):
+            if row.get(field) is not None:
+                total[field] = row[field] if total.get(field) is None else pick(total[field], row[field])
+
+    histograms = collection.aggregate([
+        {"$match": match},
+        {"$project": {"server_id": 1, "hist": {"$objectToArray": "$latency_hist"}}},
+        {"$unwind": "$hist"},
+        {"$group": {"_id": {"server_id": "$server_id", "bucket": "$hist.k"}, "count": {"$sum": "$hist.v"}}},
+    ])
+
+    for row in histograms:
+        hist = hists.setdefault(row["_id"]["server_id"], {})
+        hist[row["_id"]["bucket"]] = hist.get(row["_id"]["bucket"], 0) + row["count"]
+
+
+def summarize_rollups(db, match, start, end):
+    granularity = rollup_granularity(start, end)
+
+    # buckets are clamped to the requested window, a partial edge bucket is read from a finer collection
+    ranges = {}
+    for segment_granularity, segment_start, segment_end in rollup_segments(start, end, granularity):
+        if segment_start < segment_end:
+            ranges.setdefault(segment_granularity, []).append({"bucket": {"$gte": segment_start, "$lt": segment_end}})
+
+    totals = {}
+    hist_by_server = {}
+    for segment_granularity, bucket_ranges in ranges.items():
+        aggregate_rollups(db[ROLLUP_COLLECTIONS[segment_granularity]], dict(match, **{"$or": bucket_ranges}), totals, hist_by_server)
+
+    servers = {}
+    overall = {field: 0 for field in SUM_FIELDS}
+    overall_hist = {}
+
+    for server_id, row in totals.items():
+        hist = hist_by_server.get(server_id, {})
+        servers[str(server_id)] = build_summary(row, hist)
+
+        for field in overall:
+            overall[field] += row.get(field) or 0
+        for bucket, count in hist.items():
+            overall_hist[bucket] = overall_hist.get(bucket, 0) + count
+
+    return {
+        "granularity": granularity,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "overall": build_summary(overall, overall_hist),
+        "servers": servers,
+    }
+
+
+def build_summary(row, hist):
+    count = row.get("count") or 0
+    latency_count = row.get("latency_count") or 0
+
+    return {
+        "checks": count,
+        "failed_checks": row.get("fail") or 0,
+        "uptime_percent": round((row.get("ok") or 0) * 100 / count, 3) if count else None,
+        "incidents": row.get("incidents") or 0,
+        "latency_avg_ms": round(row["latency_sum"] / latency_count, 2) if latency_count else None,
+        "latency_min_ms": row.get("latency_min"),
+        "latency_max_ms": row.get("latency_max"),
+        "latency_p50_ms": percentile_from_hist(hist, 0.50),
+        "latency_p95_ms": percentile_from_hist(hist, 0.95),
+        "latency_p99_ms": percentile_from_hist(hist, 0.99),
+    }
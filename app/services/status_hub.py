@@ -0,0 +1,145 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.settings.config import LIVE_QUEUE_SIZE, LIVE_POLL_INTERVAL
+
+STATUS_FIELDS = ["state", "last_status"]
+EVENT_FIELDS = ["user_id", "name", "host", "protocol", "state", "last_status", "state_changed_at", "last_checked_at"]
+
+# stamped by the worker whenever state or last_status moves, the poll fallback reads it through an index
+POLL_FIELD = "status_changed_at"
+
+# the worker only writes on transitions, so every matching update is a status change worth pushing
+CHANGE_PIPELINE = [
+    {"$match": {"operationType": "update", "$or": [{f"updateDescription.updatedFields.{field}": {"$exists": True}} for field in STATUS_FIELDS]}},
+    {"$project": {"operationType": 1, "documentKey": 1, **{f"fullDocument.{field}": 1 for field in EVENT_FIELDS}}},
+]
+
+
+def status_event(server):
+    event = {"server_id": str(server["_id"])}
+    for field in EVENT_FIELDS:
+        if field == "user_id":
+            continue
+        value = server.get(field)
+        event[field] = value.isoformat() if isinstance(value, datetime) else value
+    return event
+
+
+class Subscription:
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize=LIVE_QUEUE_SIZE)
+
+
+class StatusHub:
+
+    def __init__(self):
+        self.collection = None
+        self.loop = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.subscribers = {}
+        self.watching = False
+        self.stats = {"events": 0, "delivered": 0, "overflows": 0, "watch_errors": 0}
+
+    def start(self, db):
+        if self.thread is not None:
+            return
+
+        with self.lock:
+            if self.thread is None:
+                self.collection = db.servers
+                self.loop = asyncio.get_running_loop()
+                self.thread = threading.Thread(target=self.watch_blocking, name="status-hub", daemon=True)
+                self.thread.start()
+
+    def subscribe(self, db, user_id):
+        self.start(db)
+        subscription = Subscription(str(user_id))
+        self.subscribers.setdefault(subscription.user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscriptions = self.subscribers.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self.subscribers[subscription.user_id]
+
+    def publish(self, server):
+        self.stats["events"] += 1
+        subscriptions = self.subscribers.get(str(server.get("user_id")))
+        if not subscriptions:
+            return
+
+        event = status_event(server)
+        for subscription in list(subscriptions):
+            try:
+                subscription.queue.put_nowait(event)
+                self.stats["delivered"] += 1
+            except asyncio.QueueFull:
+                # a client this far behind is cut off, it reconnects and starts from a fresh snapshot
+                self.stats["overflows"] += 1
+                self.unsubscribe(subscription)
+                subscription.queue.get_nowait()
+                subscription.queue.put_nowait(None)
+
+    def watch_blocking(self):
+        resume_token = None
+
+        while True:
+            try:
+                with self.collection.watch(CHANGE_PIPELINE, full_document="updateLookup", resume_after=resume_token, max_await_time_ms=1000) as stream:
+                    self.watching = True
+                    while stream.alive:
+                        change = stream.try_next()
+                        resume_token = stream.resume_token
+                        if change is not None and change.get("fullDocument"):
+                            self.loop.call_soon_threadsafe(self.publish, {"_id": change["documentKey"]["_id"], **change["fullDocument"]})
+            except OperationFailure as e:
+                self.watching = False
+                self.stats["watch_errors"] += 1
+
+                # standalone servers have no change streams, poll for transitions instead
+                if e.code == 40573:
+                    print("[LIVE] change streams not available, polling for status changes")
+                    return self.poll_blocking()
+
+                resume_token = None
+                print(f"[ERROR] STATUS CHANGE STREAM FAILED: {e}")
+                time.sleep(5)
+            except PyMongoError as e:
+                self.watching = False
+                self.stats["watch_errors"] += 1
+                print(f"[ERROR] STATUS CHANGE STREAM FAILED: {e}")
+                time.sleep(5)
+
+    def poll_blocking(self):
+        since = datetime.now(timezone.utc)
+
+        while True:
+            time.sleep(LIVE_POLL_INTERVAL)
+
+            try:
+                servers = list(self.collection.find({POLL_FIELD: {"$gt": since}}, EVENT_FIELDS + [POLL_FIELD]))
+            except PyMongoError as e:
+                self.stats["watch_errors"] += 1
+                print(f"[ERROR] STATUS POLL FAILED: {e}")
+                continue
+
+            for server in servers:
+                changed_at = server.pop(POLL_FIELD)
+                since = max(since, changed_at if changed_at.tzinfo else changed_at.replace(tzinfo=timezone.utc))
+                self.loop.call_soon_threadsafe(self.publish, server)
+
+    def summary(self):
+        return dict(self.stats, users=len(self.subscribers), subscriptions=sum(len(s) for s in self.subscribers.values()), watching=self.watching)
+
+
+status_hub = StatusHub()
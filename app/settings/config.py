@@ -35,4 +35,101 @@ SMTP_HOST = os.getenv("SMTP_HOST")
 SMTP_PORT = os.getenv("SMTP_PORT")
 SMTP_EMAİL = os.getenv("SMTP_EMAİL")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
-SENDER_NAME = os.getenv("SENDER__NAME")
\ No newline at end of file
+SENDER_NAME = os.getenv("SENDER__NAME")
+
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT") or 1000)
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST") or 4)
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT") or 75)
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL") or 300)
+
+
+MONITOR_DEFAULT_INTERVAL = int(os.getenv("MONITOR_DEFAULT_INTERVAL") or 30)
+MONITOR_MIN_INTERVAL = int(os.getenv("MONITOR_MIN_INTERVAL") or 5)
+MONITOR_MAX_IN_FLIGHT = int(os.getenv("MONITOR_MAX_IN_FLIGHT") or 500)
+MONITOR_RELOAD_INTERVAL = int(os.getenv("MONITOR_RELOAD_INTERVAL") or 30)
+MONITOR_RESYNC_INTERVAL = int(os.getenv("MONITOR_RESYNC_INTERVAL") or 600)
+MONITOR_RETRY_DELAY = float(os.getenv("MONITOR_RETRY_DELAY") or 5)
+MONITOR_DEGRADED_INTERVAL = int(os.getenv("MONITOR_DEGRADED_INTERVAL") or 10)
+MONITOR_STABLE_CHECKS = int(os.getenv("MONITOR_STABLE_CHECKS") or 0)
+MONITOR_MAX_BACKOFF = int(os.getenv("MONITOR_MAX_BACKOFF") or 4)
+MONITOR_FLAP_WINDOW = int(os.getenv("MONITOR_FLAP_WINDOW") or 900)
+MONITOR_FLAP_THRESHOLD = int(os.getenv("MONITOR_FLAP_THRESHOLD") or 4)
+
+# MONITOR_SHARDS=0 turns sharding off for a single worker deployment
+MONITOR_SHARDS = int(os.getenv("MONITOR_SHARDS") or 64)
+MONITOR_LEASE_TTL = int(os.getenv("MONITOR_LEASE_TTL") or 30)
+MONITOR_LEASE_RENEW_INTERVAL = int(os.getenv("MONITOR_LEASE_RENEW_INTERVAL") or 10)
+
+
+STATUS_BATCH_SIZE = int(os.getenv("STATUS_BATCH_SIZE") or 500)
+STATUS_FLUSH_INTERVAL = float(os.getenv("STATUS_FLUSH_INTERVAL") or 1.0)
+STATUS_HEARTBEAT_INTERVAL = int(os.getenv("STATUS_HEARTBEAT_INTERVAL") or 300)
+
+
+SMTP_IDLE_TIMEOUT = int(os.getenv("SMTP_IDLE_TIMEOUT") or 60)
+ALERT_QUEUE_SIZE = int(os.getenv("ALERT_QUEUE_SIZE") or 10000)
+ALERT_WORKERS = int(os.getenv("ALERT_WORKERS") or 1)
+ALERT_MAX_RETRIES = int(os.getenv("ALERT_MAX_RETRIES") or 3)
+ALERT_RETRY_BASE_DELAY = float(os.getenv("ALERT_RETRY_BASE_DELAY") or 5)
+ALERT_COALESCE_WINDOW = float(os.getenv("ALERT_COALESCE_WINDOW") or 30)
+ALERT_CONTACT_MAX_PER_HOUR = int(os.getenv("ALERT_CONTACT_MAX_PER_HOUR") or 12)
+ALERT_STORM_THRESHOLD = int(os.getenv("ALERT_STORM_THRESHOLD") or 20)
+ALERT_DIGEST_MAX_ITEMS = int(os.getenv("ALERT_DIGEST_MAX_ITEMS") or 50)
+
+
+ICMP_DNS_CACHE_TTL = int(os.getenv("ICMP_DNS_CACHE_TTL") or 300)
+
+
+TCP_DNS_CACHE_TTL = int(os.getenv("TCP_DNS_CACHE_TTL") or 300)
+TCP_BANNER_BYTES = int(os.getenv("TCP_BANNER_BYTES") or 1024)
+
+
+HISTORY_RAW_TTL_DAYS = int(os.getenv("HISTORY_RAW_TTL_DAYS") or 7)
+HISTORY_MINUTE_TTL_DAYS = int(os.getenv("HISTORY_MINUTE_TTL_DAYS") or 30)
+HISTORY_HOUR_TTL_DAYS = int(os.getenv("HISTORY_HOUR_TTL_DAYS") or 400)
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE") or 1000)
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL") or 2.0)
+
+
+UPTIME_CACHE_TTL = int(os.getenv("UPTIME_CACHE_TTL") or 60)
+
+
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE") or 10000)
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL") or 60)
+
+
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE") or 50000)
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE") or 500)
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL") or 1.0)
+AUDIT_MAX_LIST_ITEMS = int(os.getenv("AUDIT_MAX_LIST_ITEMS") or 20)
+AUDIT_MAX_STRING = int(os.getenv("AUDIT_MAX_STRING") or 1000)
+AUDIT_READ_SAMPLE_RATE = float(os.getenv("AUDIT_READ_SAMPLE_RATE") or 1.0)
+
+
+PAGE_DEFAULT_LIMIT = int(os.getenv("PAGE_DEFAULT_LIMIT") or 100)
+PAGE_MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT") or 1000)
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE") or 500)
+
+
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS") or 10000)
+
+
+PASSWORD_POOL_SIZE = int(os.getenv("PASSWORD_POOL_SIZE") or os.cpu_count() or 2)
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT") or 64)
+PASSWORD_JOB_TIMEOUT = float(os.getenv("PASSWORD_JOB_TIMEOUT") or 10)
+
+
+LEGACY_TIMEZONE = os.getenv("LEGACY_TIMEZONE") or "Europe/Istanbul"
+LOG_QUERY_MAX_LIMIT = int(os.getenv("LOG_QUERY_MAX_LIMIT") or 1000)
+
+
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT") or 9100)
+
+
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE") or 1000)
+LIVE_KEEPALIVE_INTERVAL = float(os.getenv("LIVE_KEEPALIVE_INTERVAL") or 15)
+LIVE_POLL_INTERVAL = float(os.getenv("LIVE_POLL_INTERVAL") or 5)
+
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE") or 2000)
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES") or 1048576)
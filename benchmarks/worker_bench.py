@@ -0,0 +1,366 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+# Stand-ins for the worker's dependencies: an HTTP server farm and an SMTP sink run in a
+# separate process, MongoDB is replaced by an in-memory database inside the measured process.
+#
+#   python -m benchmarks.worker_bench --sizes 1000,10000,50000 --duration 60
+#   python -m benchmarks.worker_bench --sizes 10000 --protocol tcp
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the monitor worker against simulated servers")
+    parser.add_argument("--sizes", default="1000,10000,50000")
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--interval", type=int, default=30)
+    parser.add_argument("--protocol", choices=("http", "tcp"), default="http")
+    parser.add_argument("--farm-ports", type=int, default=50)
+    parser.add_argument("--base-port", type=int, default=18000)
+    parser.add_argument("--smtp-port", type=int, default=12525)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--max-in-flight", type=int, default=1000)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--run-one", type=int, default=None, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+# ---------------- STAND-IN SERVICES ----------------
+
+async def smtp_session(reader, writer):
+    writer.write(b"220 bench-sink ESMTP\r\n")
+    in_data = False
+
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+
+        if in_data:
+            if line in (b".\r\n", b".\n"):
+                in_data = False
+                writer.write(b"250 queued\r\n")
+            continue
+
+        command = line[:4].upper()
+        if command in (b"EHLO", b"HELO"):
+            writer.write(b"250-bench-sink\r\n250 OK\r\n")
+        elif command == b"DATA":
+            in_data = True
+            writer.write(b"354 go ahead\r\n")
+        elif command == b"QUIT":
+            writer.write(b"221 bye\r\n")
+            await writer.drain()
+            break
+        else:
+            writer.write(b"250 OK\r\n")
+
+        await writer.drain()
+
+    writer.close()
+
+
+def run_farm(ports, smtp_port, latency_ms, jitter_ms, error_rate, ready):
+    from aiohttp import web
+
+    async def handle(request):
+        await asyncio.sleep(max(0.0, random.gauss(latency_ms, jitter_ms)) / 1000)
+        if random.random() < error_rate:
+            return web.Response(status=500, text="error")
+        return web.Response(text="ok")
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/", handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+
+        for port in ports:
+            await web.TCPSite(runner, "127.0.0.1", port, backlog=4096).start()
+
+        await asyncio.start_server(smtp_session, "127.0.0.1", smtp_port)
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+# ---------------- IN-MEMORY MONGO ----------------
+
+class FakeCursor(list):
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def limit(self, count):
+        return FakeCursor(self[:count]) if count else self
+
+    def batch_size(self, size):
+        return self
+
+
+class FakeCollection:
+
+    def __init__(self, name):
+        self.name = name
+        self.docs = {}
+        self.ops = {"find": 0, "bulk_write": 0, "bulk_ops": 0, "insert": 0, "update_one": 0}
+
+    def find(self, query=None, projection=None):
+        self.ops["find"] += 1
+        query = query or {}
+        return FakeCursor(dict(d) for d in self.docs.values() if all(d.get(k) == v for k, v in query.items() if not k.startswith("$")))
+
+    def find_one(self, query=None, projection=None):
+        found = self.find(query, projection)
+        return found[0] if found else None
+
+    def bulk_write(self, operations, ordered=True):
+        self.ops["bulk_write"] += 1
+        self.ops["bulk_ops"] += len(operations)
+
+    def insert_many(self, documents, ordered=True):
+        self.ops["insert"] += len(documents)
+
+    def insert_one(self, document):
+        self.ops["insert"] += 1
+
+    def update_one(self, query, update, upsert=False):
+        self.ops["update_one"] += 1
+
+    def create_index(self, keys, **kwargs):
+        return kwargs.get("name")
+
+    def list_indexes(self):
+        return []
+
+    def aggregate(self, pipeline):
+        return []
+
+    def watch(self, *args, **kwargs):
+        from pymongo.errors import OperationFailure
+        raise OperationFailure("change streams need a replica set", code=40573)
+
+
+class FakeDatabase:
+
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(name)
+        return self.collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def create_collection(self, name, **kwargs):
+        return self[name]
+
+
+# ---------------- SINGLE RUN ----------------
+
+def configure_env(args):
+    os.environ.setdefault("MONGO_HOST", "127.0.0.1")
+    os.environ.setdefault("MONGO_PORT", "27017")
+    os.environ.setdefault("TOKEN_EXPIRE_MINUTES", "60")
+    os.environ["SMTP_HOST"] = "127.0.0.1"
+    os.environ["SMTP_PORT"] = str(args.smtp_port)
+    os.environ["WORKER_METRICS_PORT"] = "0"
+    os.environ["MONITOR_SHARDS"] = "0"
+    os.environ["MONITOR_MAX_IN_FLIGHT"] = str(args.max_in_flight)
+    os.environ.setdefault("HTTP_POOL_LIMIT", str(args.max_in_flight))
+    os.environ.setdefault("HTTP_POOL_LIMIT_PER_HOST", str(max(4, args.max_in_flight // args.farm_ports)))
+
+
+def build_servers(count, ports, interval, protocol="http"):
+    from bson import ObjectId
+
+    servers = {}
+    for i in range(count):
+        server_id = ObjectId()
+        servers[server_id] = {
+            "_id": server_id,
+            "name": f"bench-{i}",
+            "host": "127.0.0.1",
+            "port": ports[i % len(ports)],
+            "protocol": protocol,
+            "expected_status": 200,
+            "retry_count": 1,
+            "alert_interval": 60,
+            "check_interval": interval,
+            "timeout": 5,
+            "contacts": ["ops@example.com"],
+            "is_active": True,
+            "user_id": "bench",
+            "last_status": None,
+            "last_alert_at": None,
+        }
+    return servers
+
+
+async def sample_loop_lag(samples, interval=0.05):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(time.perf_counter() - start - interval, 0.0) * 1000)
+
+
+async def run_one(args, count):
+    import smtplib
+
+    import worker.monitor as monitor
+    import worker.monitor_log as monitor_log
+    from worker.metrics import CHECK_SECONDS
+    from worker.send_mail import SmtpConnection
+
+    class SinkSmtpConnection(SmtpConnection):
+
+        def open(self):
+            self.close()
+            self.server = smtplib.SMTP(host="127.0.0.1", port=args.smtp_port, timeout=15)
+            self.server.ehlo()
+            self.connects += 1
+
+    ports = [args.base_port + i for i in range(args.farm_ports)]
+    db = FakeDatabase()
+    db.servers.docs = build_servers(count, ports, args.interval, args.protocol)
+
+    monitor.db = db
+    monitor.servers_collection = db.servers
+    monitor.status_writer.collection = db.servers
+    monitor.status_writer.versions = db.user_versions
+    monitor.history_writer.db = db
+    monitor_log.get_db = lambda: db
+    monitor.alert_dispatcher.connection_factory = SinkSmtpConnection
+
+    first_checked = {}
+    check_server = monitor.check_server
+
+    async def timed_check(server):
+        await check_server(server)
+        first_checked.setdefault(server["_id"], time.perf_counter())
+
+    monitor.check_server = timed_check
+
+    lag_samples = []
+    lag_task = asyncio.create_task(sample_loop_lag(lag_samples))
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    loop_task = asyncio.create_task(monitor.monitor_loop())
+
+    await asyncio.sleep(args.duration)
+
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    loop_task.cancel()
+    lag_task.cancel()
+
+    checks = sum(series["count"] for series in CHECK_SECONDS.series.values())
+    failed = sum(series["count"] for labels, series in CHECK_SECONDS.series.items() if labels[1] == "FAIL")
+    lag_sorted = sorted(lag_samples) or [0.0]
+
+    return {
+        "servers": count,
+        "duration_s": round(elapsed, 2),
+        "check_interval_s": args.interval,
+        "protocol": args.protocol,
+        "checks": checks,
+        "failed_checks": failed,
+        "checks_per_second": round(checks / elapsed, 1),
+        "expected_checks_per_second": round(count / args.interval, 1),
+        "servers_checked": len(first_checked),
+        "first_cycle_s": round(max(first_checked.values()) - start, 2) if len(first_checked) == count else None,
+        "cpu_s": round(cpu, 2),
+        "cpu_percent": round(cpu * 100 / elapsed, 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "loop_lag_ms": {
+            "mean": round(statistics.fmean(lag_sorted), 2),
+            "p99": round(lag_sorted[min(len(lag_sorted) - 1, int(len(lag_sorted) * 0.99))], 2),
+            "max": round(lag_sorted[-1], 2),
+        },
+        "mongo_ops": {name: collection.ops for name, collection in db.collections.items()},
+        "alerts": monitor.alert_dispatcher.summary(),
+    }
+
+
+# ---------------- ORCHESTRATION ----------------
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main():
+    args = parse_args()
+
+    if args.run_one is not None:
+        configure_env(args)
+        result = asyncio.run(run_one(args, args.run_one))
+        print(json.dumps(result, default=str))
+        return
+
+    ports = [args.base_port + i for i in range(args.farm_ports)]
+    ready = multiprocessing.Event()
+    farm = multiprocessing.Process(target=run_farm, args=(ports, args.smtp_port, args.latency_ms, args.jitter_ms, args.error_rate, ready), daemon=True)
+    farm.start()
+
+    if not ready.wait(30):
+        sys.exit("server farm did not start")
+
+    runs = []
+    try:
+        for size in [int(s) for s in args.sizes.split(",") if s]:
+            print(f"[BENCH] {size} servers for {args.duration}s ...", file=sys.stderr)
+            command = [sys.executable, "-m", "benchmarks.worker_bench", "--run-one", str(size)] + sys.argv[1:]
+            completed = subprocess.run(command, capture_output=True, text=True)
+
+            if completed.returncode != 0:
+                print(completed.stderr, file=sys.stderr)
+                runs.append({"servers": size, "error": completed.stderr.strip().splitlines()[-1:]})
+                continue
+
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            runs.append(result)
+            print(f"[BENCH] {json.dumps(result)}", file=sys.stderr)
+    finally:
+        farm.terminate()
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("run_one", "output")},
+        "runs": runs,
+    }
+
+    output = args.output or os.path.join("benchmarks", "results", f"worker-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+
+from worker.health import DOWN, DEGRADED, UP, seed_health, record_health, advance_state, should_alert
+
+
+def run_check(server, success, now):
+    confirmed = record_health(server, success)
+    previous, state = advance_state(server, success, confirmed)
+    if confirmed:
+        server['last_status'] = 'OK' if success else 'FAIL'
+    incident = state == DOWN and previous != DOWN
+    return state, incident, should_alert(server, now)
+
+
+def down_server(now):
+    # the document as a fresh worker reads it back from mongo
+    return {"_id": "s1", "state": DOWN, "last_status": "FAIL", "retry_count": 2, "alert_interval": 60, "last_alert_at": now - timedelta(minutes=5)}
+
+
+def test_restarted_worker_keeps_known_outage_down_without_new_alert():
+    now = datetime.now(timezone.utc)
+    server = seed_health(down_server(now))
+
+    for _ in range(3):
+        state, incident, alert = run_check(server, False, now)
+        assert state == DOWN
+        assert not incident
+        assert not alert
+
+
+def test_unseeded_down_server_is_not_demoted_on_unconfirmed_failure():
+    now = datetime.now(timezone.utc)
+    server = down_server(now)
+
+    state, incident, alert = run_check(server, False, now)
+    assert state == DOWN
+    assert not incident
+    assert not alert
+
+
+def test_known_outage_alerts_again_after_alert_interval():
+    now = datetime.now(timezone.utc)
+    server = seed_health(down_server(now))
+    server["last_alert_at"] = now - timedelta(minutes=61)
+
+    assert run_check(server, False, now)[2]
+
+
+def test_new_outage_is_confirmed_after_retries():
+    now = datetime.now(timezone.utc)
+    server = seed_health({"_id": "s2", "state": UP, "last_status": "OK", "retry_count": 2, "alert_interval": 60})
+
+    assert run_check(server, False, now)[:2] == (DEGRADED, False)
+    assert run_check(server, False, now)[:2] == (DEGRADED, False)
+    state, incident, alert = run_check(server, False, now)
+    assert (state, incident, alert) == (DOWN, True, True)
+
+
+def test_shard_handover_seeds_health_from_persisted_state():
+    from types import SimpleNamespace
+
+    from worker.server_registry import ServerRegistry
+
+    now = datetime.now(timezone.utc)
+    registry = ServerRegistry(None, SimpleNamespace(servers={}))
+    server = registry.carry_state(down_server(now))
+
+    state, incident, alert = run_check(server, False, now)
+    assert (state, incident, alert) == (DOWN, False, False)
+
+
+def test_flapping_server_stays_flapping_after_handover():
+    from worker.health import FLAPPING
+
+    now = datetime.now(timezone.utc)
+    server = seed_health({"_id": "s3", "state": FLAPPING, "last_status": "OK", "retry_count": 0, "alert_interval": 60})
+
+    assert run_check(server, True, now)[0] == FLAPPING
@@ -0,0 +1,125 @@
+import asyncio
+import time
+from collections import Counter, deque
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from app.settings.config import ALERT_COALESCE_WINDOW, ALERT_CONTACT_MAX_PER_HOUR, ALERT_STORM_THRESHOLD, ALERT_DIGEST_MAX_ITEMS
+from worker.metrics import ALERTS
+
+
+class AlertDigester:
+
+    def __init__(self, dispatcher, window=ALERT_COALESCE_WINDOW, max_per_hour=ALERT_CONTACT_MAX_PER_HOUR, storm_threshold=ALERT_STORM_THRESHOLD):
+        self.dispatcher = dispatcher
+        self.window = window
+        self.max_per_hour = max_per_hour
+        self.storm_threshold = storm_threshold
+        self.pending = {}
+        self.sent = {}
+        self.stats = {"alerts": 0, "digests": 0, "recipients": 0, "storms": 0, "rate_limited": 0}
+
+    def add(self, server, result, body):
+        entry = {
+            "server_id": str(server["_id"]),
+            "user_id": server.get("user_id"),
+            "name": server.get("name"),
+            "host": server.get("host"),
+            "port": server.get("port"),
+            "protocol": server.get("protocol"),
+            "result": str(result),
+            "body": body,
+        }
+        self.stats["alerts"] += 1
+
+        # one open window per contact address, a server failing twice inside it is listed once
+        for email in server.get("contacts", []):
+            digest = self.pending.get(email)
+            if digest is None:
+                digest = self.pending[email] = {"opened": time.monotonic(), "entries": {}}
+            digest["entries"][entry["server_id"]] = entry
+
+    def allowed(self, email, now):
+        if not self.max_per_hour:
+            return True
+
+        sent = self.sent.setdefault(email, deque())
+        while sent and now - sent[0] > 3600:
+            sent.popleft()
+        return len(sent) < self.max_per_hour
+
+    def build(self, entries):
+        if len(entries) == 1:
+            entry = entries[0]
+            return f"Server Alert: {entry['name']}", entry["body"]
+
+        now = datetime.now(ZoneInfo("Europe/Istanbul")).strftime("%d.%m.%Y %H:%M:%S")
+        storm = len(entries) >= self.storm_threshold
+
+        if storm:
+            subject = f"Mass Outage: {len(entries)} servers failing"
+        else:
+            subject = f"Server Alert: {len(entries)} servers failing"
+
+        lines = ["Server Alert!", "", f"Date: {now}", "", f"{len(entries)} servers failed their checks."]
+
+        if storm:
+            # a storm is usually one cause, show what the failures have in common first
+            lines += ["", "Most common results:"]
+            lines += [f"    {result}: {count}" for result, count in Counter(e["result"] for e in entries).most_common(5)]
+            lines += ["", "By protocol and port:"]
+            lines += [f"    {protocol}/{port}: {count}" for (protocol, port), count in Counter((e["protocol"], e["port"]) for e in entries).most_common(5)]
+
+        lines += ["", "Servers:"]
+        for entry in entries[:ALERT_DIGEST_MAX_ITEMS]:
+            lines.append(f"    {entry['name']} ({entry['protocol']}://{entry['host']}:{entry['port']}): {entry['result']}")
+
+        if len(entries) > ALERT_DIGEST_MAX_ITEMS:
+            lines.append(f"    ... and {len(entries) - ALERT_DIGEST_MAX_ITEMS} more")
+
+        lines += ["", "Please check the servers."]
+        return subject, "\n".join(lines)
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        groups = {}
+
+        for email, digest in list(self.pending.items()):
+            if not force and now - digest["opened"] < self.window:
+                continue
+
+            # over the limit the window stays open and keeps collecting until the contact may get mail again
+            if not force and not self.allowed(email, now):
+                if not digest.get("held"):
+                    digest["held"] = True
+                    self.stats["rate_limited"] += 1
+                    ALERTS.inc("rate_limited")
+                continue
+
+            del self.pending[email]
+            self.sent.setdefault(email, deque()).append(now)
+
+            # contacts due in the same tick with the same servers share one message
+            key = tuple(sorted(digest["entries"]))
+            group = groups.setdefault(key, {"to_list": [], "entries": list(digest["entries"].values())})
+            group["to_list"].append(email)
+
+        for group in groups.values():
+            entries = sorted(group["entries"], key=lambda e: e["name"] or "")
+            subject, body = self.build(entries)
+
+            if len(entries) >= self.storm_threshold:
+                self.stats["storms"] += 1
+
+            servers = [{"server_id": e["server_id"], "user_id": e["user_id"]} for e in entries]
+            self.dispatcher.enqueue(group["to_list"], subject, body, servers=servers)
+            self.stats["digests"] += 1
+            self.stats["recipients"] += len(group["to_list"])
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(1)
+            self.flush()
+
+    def summary(self):
+        return dict(self.stats, open_windows=len(self.pending))
@@ -0,0 +1,125 @@
+import asyncio
+import time
+
+from app.settings.config import ALERT_QUEUE_SIZE, ALERT_WORKERS, ALERT_MAX_RETRIES, ALERT_RETRY_BASE_DELAY
+from worker.metrics import SMTP_SEND_SECONDS, ALERTS
+from worker.monitor_log import log_monitor_events
+from worker.send_mail import SmtpConnection, build_message
+
+
+class AlertDispatcher:
+
+    def __init__(self, workers=ALERT_WORKERS, queue_size=ALERT_QUEUE_SIZE, connection_factory=SmtpConnection):
+        self.workers = workers
+        self.connection_factory = connection_factory
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.connections = []
+        self.tasks = []
+        self.retries = {}
+        self.stats = {"queued": 0, "sent": 0, "failed": 0, "retried": 0, "dropped": 0, "send_ms_total": 0.0, "max_send_ms": 0.0}
+
+    def enqueue(self, to_list, subject, body, servers=None):
+        if not to_list:
+            return False
+
+        # servers: [{"server_id", "user_id"}] the message reports on, one monitor log entry each
+        alert = {"to_list": to_list, "subject": subject, "body": body, "servers": servers or [], "attempt": 0}
+
+        try:
+            self.queue.put_nowait(alert)
+        except asyncio.QueueFull:
+            # checks never wait on mail delivery, a full queue drops the alert instead
+            self.stats["dropped"] += 1
+            ALERTS.inc("dropped")
+            print(f"[ERROR] ALERT QUEUE FULL, dropped alert: {subject}")
+            return False
+
+        self.stats["queued"] += 1
+        return True
+
+    def start(self):
+        for _ in range(self.workers):
+            connection = self.connection_factory()
+            self.connections.append(connection)
+            self.tasks.append(asyncio.create_task(self.worker(connection)))
+
+    async def worker(self, connection):
+        while True:
+            alert = await self.queue.get()
+            try:
+                await self.deliver(connection, alert)
+            finally:
+                self.queue.task_done()
+
+    async def deliver(self, connection, alert):
+        start = time.perf_counter()
+
+        try:
+            await asyncio.to_thread(connection.send, build_message(alert["to_list"], alert["subject"], alert["body"]))
+        except Exception as e:
+            SMTP_SEND_SECONDS.observe(time.perf_counter() - start, "error")
+            # quit() blocks on a failing relay, keep it off the event loop
+            await asyncio.to_thread(connection.close)
+            alert["attempt"] += 1
+
+            if alert["attempt"] <= ALERT_MAX_RETRIES:
+                self.stats["retried"] += 1
+                ALERTS.inc("retried")
+                delay = ALERT_RETRY_BASE_DELAY * 2 ** (alert["attempt"] - 1)
+                self.retries[id(alert)] = (asyncio.get_running_loop().call_later(delay, self.retry, alert), alert)
+                return
+
+            self.stats["failed"] += 1
+            ALERTS.inc("failed")
+            await self.log(alert, "error", f"Email sending failed: {e}", "FAIL")
+            return
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        SMTP_SEND_SECONDS.observe(elapsed_ms / 1000, "sent")
+        ALERTS.inc("sent")
+        self.stats["sent"] += 1
+        self.stats["send_ms_total"] += elapsed_ms
+        self.stats["max_send_ms"] = max(self.stats["max_send_ms"], elapsed_ms)
+        await self.log(alert, "alert", "Alert email sent", "SUCCESS")
+
+    def retry(self, alert):
+        self.retries.pop(id(alert), None)
+        try:
+            self.queue.put_nowait(alert)
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            print(f"[ERROR] ALERT QUEUE FULL, dropped retry: {alert['subject']}")
+
+    async def log(self, alert, log_type, message, status):
+        if not alert["servers"]:
+            return
+
+        await asyncio.to_thread(log_monitor_events, alert["servers"], log_type=log_type, message=message, contacts=alert["to_list"], status=status, response=alert["body"])
+
+    async def close(self, timeout=10):
+        # alerts waiting out a retry backoff get their last attempt now instead of vanishing with the loop
+        for handle, alert in list(self.retries.values()):
+            handle.cancel()
+            self.retry(alert)
+
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        undelivered = self.queue.qsize() + len(self.retries)
+        if undelivered:
+            self.stats["dropped"] += undelivered
+            print(f"[ERROR] SHUTDOWN DROPPED {undelivered} UNDELIVERED ALERTS")
+
+        for task in self.tasks:
+            task.cancel()
+
+        for connection in self.connections:
+            await asyncio.to_thread(connection.close)
+
+    def summary(self):
+        sent = self.stats["sent"]
+        summary = dict(self.stats, pending=self.queue.qsize(), avg_send_ms=round(self.stats["send_ms_total"] / sent, 2) if sent else None, smtp_connects=sum(c.connects for c in self.connections))
+        self.stats["max_send_ms"] = 0.0
+        return summary
@@ -0,0 +1,87 @@
+import time
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+from app.settings.config import MONITOR_FLAP_WINDOW, MONITOR_FLAP_THRESHOLD
+
+UP = "UP"
+DEGRADED = "DEGRADED"
+DOWN = "DOWN"
+FLAPPING = "FLAPPING"
+
+STATES = (UP, DEGRADED, DOWN, FLAPPING)
+
+
+def seed_health(server):
+    # streaks live in memory only, a restarted worker or a moved shard must not treat a known outage as new
+    if 'fail_streak' in server or 'ok_streak' in server:
+        return server
+
+    if server.get('state') == DOWN or server.get('last_status') == 'FAIL':
+        server['fail_streak'] = int(server.get('retry_count') or 0) + 1
+        server['ok_streak'] = 0
+
+    # the flip times are monotonic clock readings of the old process, start a full window here instead
+    if server.get('state') == FLAPPING:
+        server['flips'] = [time.monotonic()] * MONITOR_FLAP_THRESHOLD
+    return server
+
+
+def record_health(server, success):
+    if success:
+        server['ok_streak'] = server.get('ok_streak', 0) + 1
+        server['fail_streak'] = 0
+    else:
+        server['fail_streak'] = server.get('fail_streak', 0) + 1
+        server['ok_streak'] = 0
+
+    # a failure only counts once retry_count quick re-checks agree with it
+    return success or server['fail_streak'] > int(server.get('retry_count') or 0)
+
+
+# must run before last_status is updated, a confirmed status change counts as a flip
+def advance_state(server, success, confirmed, now=None):
+    now = time.monotonic() if now is None else now
+    previous = server.get('state')
+    status = 'OK' if success else 'FAIL'
+
+    flips = [t for t in server.get('flips', []) if now - t < MONITOR_FLAP_WINDOW]
+    if confirmed and server.get('last_status') not in (None, status):
+        flips.append(now)
+    server['flips'] = flips
+
+    if len(flips) >= MONITOR_FLAP_THRESHOLD:
+        state = FLAPPING
+    elif success:
+        state = UP
+    elif confirmed or previous == DOWN:
+        # an unconfirmed failure never softens an outage back to DEGRADED
+        state = DOWN
+    else:
+        state = DEGRADED
+
+    server['state'] = state
+    return previous, state
+
+
+def parse_last_alert(last_alert):
+    if not last_alert:
+        return None
+
+    # documents not yet converted by app.database.migrate_timestamps still hold the old string format
+    if isinstance(last_alert, str):
+        return datetime.strptime(last_alert, "%d.%m.%Y %H:%M:%S").replace(tzinfo=ZoneInfo("Europe/Istanbul")).astimezone(timezone.utc)
+    if isinstance(last_alert, datetime):
+        return last_alert if last_alert.tzinfo else last_alert.replace(tzinfo=timezone.utc)
+    return last_alert
+
+
+def should_alert(server, now):
+    if server.get('last_status') != 'FAIL':
+        return False
+
+    # fresh outages included, nothing goes out again inside alert_interval; last_alert_at is persisted,
+    # so a restarted worker or a new shard owner does not repeat an alert that was already sent
+    last_alert = parse_last_alert(server.get('last_alert_at'))
+    alert_interval = server.get('alert_interval', 60)
+    return not last_alert or (now - last_alert).total_seconds() > alert_interval * 60
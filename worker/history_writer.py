@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+from pymongo import UpdateOne
+
+from app.services.check_history import CHECK_RESULTS, ROLLUP_COLLECTIONS, bucket_start, rollup_increments
+from app.settings.config import HISTORY_BATCH_SIZE, HISTORY_FLUSH_INTERVAL
+from worker.metrics import FLUSH_SECONDS
+
+
+class HistoryWriter:
+
+    def __init__(self, db, batch_size=HISTORY_BATCH_SIZE, flush_interval=HISTORY_FLUSH_INTERVAL):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.results = []
+        self.rollups = {}
+        self.flush_lock = asyncio.Lock()
+        self.stats = {"results": 0, "flushes": 0, "rollup_writes": 0, "errors": 0, "dropped_results": 0, "last_flush_ms": 0.0, "max_flush_ms": 0.0}
+
+    async def record(self, result):
+        self.results.append({
+            "timestamp": result["timestamp"],
+            "meta": {"server_id": result["server_id"], "user_id": result.get("user_id"), "protocol": result.get("protocol")},
+            "status": result["status"],
+            "http_code": result.get("http_code"),
+            "rtt_ms": result.get("rtt_ms"),
+            "latency_ms": result.get("latency_ms"),
+            "connect_ms": result.get("connect_ms"),
+            "error": result.get("error"),
+            "duration_ms": result.get("duration_ms"),
+        })
+        self.stats["results"] += 1
+
+        inc = rollup_increments(result)
+        latency = result.get("latency_ms")
+
+        # every result inside the same bucket is folded into one upsert per granularity
+        for granularity in ROLLUP_COLLECTIONS:
+            key = (granularity, result["server_id"], bucket_start(result["timestamp"], granularity))
+            self.merge_rollup(key, {"user_id": result.get("user_id"), "inc": inc, "min": latency, "max": latency})
+
+        if len(self.results) >= self.batch_size:
+            await self.flush()
+
+    def merge_rollup(self, key, other):
+        rollup = self.rollups.get(key)
+
+        if rollup is None:
+            rollup = {"user_id": other["user_id"], "inc": {}, "min": None, "max": None}
+            self.rollups[key] = rollup
+
+        for field, value in other["inc"].items():
+            rollup["inc"][field] = rollup["inc"].get(field, 0) + value
+
+        if other["min"] is not None:
+            rollup["min"] = other["min"] if rollup["min"] is None else min(rollup["min"], other["min"])
+            rollup["max"] = other["max"] if rollup["max"] is None else max(rollup["max"], other["max"])
+
+    def rollup_operations(self, rollups):
+        operations = {granularity: [] for granularity in ROLLUP_COLLECTIONS}
+
+        for (granularity, server_id, bucket), rollup in rollups.items():
+            update = {"$inc": rollup["inc"], "$setOnInsert": {"user_id": rollup["user_id"]}}
+            if rollup["min"] is not None:
+                update["$min"] = {"latency_min": rollup["min"]}
+                update["$max"] = {"latency_max": rollup["max"]}
+
+            operations[granularity].append(UpdateOne({"server_id": server_id, "bucket": bucket}, update, upsert=True))
+
+        return operations
+
+    def write(self, results, rollups):
+        # whatever is written is taken out of results and rollups, the caller requeues the rest
+        if results:
+            self.db[CHECK_RESULTS].insert_many(results, ordered=False)
+            results.clear()
+
+        for granularity, operations in self.rollup_operations(rollups).items():
+            if operations:
+                self.db[ROLLUP_COLLECTIONS[granularity]].bulk_write(operations, ordered=False)
+                self.stats["rollup_writes"] += len(operations)
+            for key in [key for key in rollups if key[0] == granularity]:
+                del rollups[key]
+
+    async def flush(self):
+        async with self.flush_lock:
+            if not self.results and not self.rollups:
+                return
+
+            results, self.results = self.results, []
+            rollups, self.rollups = self.rollups, {}
+            start = time.perf_counter()
+
+            try:
+                await asyncio.to_thread(self.write, results, rollups)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[ERROR] HISTORY FLUSH FAILED: {e}")
+
+                # raw results are given up, the rollups behind /uptime go back into the next flush
+                self.stats["dropped_results"] += len(results)
+                for key, rollup in rollups.items():
+                    self.merge_rollup(key, rollup)
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            FLUSH_SECONDS.observe(elapsed_ms / 1000, "history")
+            self.stats["flushes"] += 1
+            self.stats["last_flush_ms"] = elapsed_ms
+            self.stats["max_flush_ms"] = max(self.stats["max_flush_ms"], elapsed_ms)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def summary(self):
+        summary = dict(self.stats, pending=len(self.results))
+        self.stats["max_flush_ms"] = 0.0
+        return summary
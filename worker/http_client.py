@@ -0,0 +1,108 @@
+import ssl
+import time
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, TraceConfig
+
+from app.settings.config import HTTP_POOL_LIMIT, HTTP_POOL_LIMIT_PER_HOST, HTTP_KEEPALIVE_TIMEOUT, HTTP_DNS_CACHE_TTL
+
+_session = None
+_ssl_context = None
+
+probe_stats = {
+    "new": {"count": 0, "total_ms": 0.0, "connect_ms": 0.0},
+    "reused": {"count": 0, "total_ms": 0.0},
+}
+
+
+async def _on_connection_create_start(session, ctx, params):
+    ctx.trace_request_ctx["connect_start"] = time.perf_counter()
+
+
+async def _on_connection_create_end(session, ctx, params):
+    timing = ctx.trace_request_ctx
+    timing["connect_ms"] = (time.perf_counter() - timing["connect_start"]) * 1000
+
+
+async def _on_connection_reuseconn(session, ctx, params):
+    ctx.trace_request_ctx["reused"] = True
+
+
+def _trace_config():
+    trace_config = TraceConfig()
+    trace_config.on_connection_create_start.append(_on_connection_create_start)
+    trace_config.on_connection_create_end.append(_on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(_on_connection_reuseconn)
+    return trace_config
+
+
+def get_ssl_context():
+    # one context for every https probe, so the CA bundle is loaded once and TLS state is shared
+    global _ssl_context
+    if _ssl_context is None:
+        _ssl_context = ssl.create_default_context()
+    return _ssl_context
+
+
+def get_session():
+    global _session
+
+    if _session is None or _session.closed:
+        connector = TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            use_dns_cache=True,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            ssl=get_ssl_context(),
+        )
+        _session = ClientSession(connector=connector, trace_configs=[_trace_config()])
+
+    return _session
+
+
+async def close_session():
+    global _session
+
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+def record_probe(timing):
+    if timing.get("reused"):
+        stats = probe_stats["reused"]
+    else:
+        stats = probe_stats["new"]
+        stats["connect_ms"] += timing.get("connect_ms") or 0.0
+
+    stats["count"] += 1
+    stats["total_ms"] += timing["total_ms"]
+
+
+async def fetch_status(url, timeout):
+    timing = {"connect_ms": None, "reused": False}
+    start = time.perf_counter()
+
+    async with get_session().get(url, timeout=ClientTimeout(total=timeout), trace_request_ctx=timing) as response:
+        # read the body so the connection goes back to the pool instead of being closed
+        await response.read()
+        status = response.status
+
+    timing["total_ms"] = (time.perf_counter() - start) * 1000
+    timing.pop("connect_start", None)
+    record_probe(timing)
+
+    return status, timing
+
+
+def probe_latency_summary():
+    new = probe_stats["new"]
+    reused = probe_stats["reused"]
+
+    return {
+        "new_connections": new["count"],
+        "reused_connections": reused["count"],
+        "avg_ms_with_connect": round(new["total_ms"] / new["count"], 2) if new["count"] else None,
+        "avg_connect_ms": round(new["connect_ms"] / new["count"], 2) if new["count"] else None,
+        "avg_ms_reused": round(reused["total_ms"] / reused["count"], 2) if reused["count"] else None,
+    }
@@ -0,0 +1,137 @@
+import asyncio
+import ipaddress
+import os
+import socket
+import struct
+import time
+
+from app.settings.config import ICMP_DNS_CACHE_TTL
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+
+def icmp_checksum(data):
+    if len(data) % 2:
+        data += b"\x00"
+
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def build_echo_request(identifier, sequence, payload=b"server-monitor"):
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, identifier, sequence)
+    checksum = icmp_checksum(header + payload)
+    return struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, checksum, identifier, sequence) + payload
+
+
+class IcmpEngine:
+
+    def __init__(self):
+        self.sock = None
+        self.loop = None
+        self.privileged = False
+        self.identifier = os.getpid() & 0xFFFF
+        self.sequence = 0
+        self.pending = {}
+        self.dns_cache = {}
+
+    def open(self):
+        try:
+            # unprivileged ping socket, allowed when net.ipv4.ping_group_range covers our gid
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+            self.privileged = False
+        except PermissionError:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+            self.privileged = True
+
+        sock.setblocking(False)
+        self.sock = sock
+        self.loop = asyncio.get_running_loop()
+        self.loop.add_reader(sock.fileno(), self.on_readable)
+
+    def close(self):
+        if self.sock is None:
+            return
+
+        self.loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+        self.sock = None
+
+        for future, _, _ in self.pending.values():
+            if not future.done():
+                future.cancel()
+        self.pending.clear()
+
+    def next_sequence(self):
+        for _ in range(0x10000):
+            self.sequence = (self.sequence + 1) & 0xFFFF
+            if self.sequence not in self.pending:
+                return self.sequence
+        raise RuntimeError("too many ICMP requests in flight")
+
+    async def resolve(self, host):
+        try:
+            return str(ipaddress.IPv4Address(host))
+        except ValueError:
+            pass
+
+        cached = self.dns_cache.get(host)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        infos = await asyncio.get_running_loop().getaddrinfo(host, None, family=socket.AF_INET)
+        address = infos[0][4][0]
+        self.dns_cache[host] = (address, time.monotonic() + ICMP_DNS_CACHE_TTL)
+        return address
+
+    async def ping(self, host, timeout):
+        if self.sock is None:
+            self.open()
+
+        loop = asyncio.get_running_loop()
+        address = await self.resolve(host)
+        sequence = self.next_sequence()
+        future = loop.create_future()
+        self.pending[sequence] = (future, address, time.perf_counter())
+
+        try:
+            await loop.sock_sendto(self.sock, build_echo_request(self.identifier, sequence), (address, 0))
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self.pending.pop(sequence, None)
+
+    def on_readable(self):
+        while True:
+            try:
+                data, (address, _) = self.sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+
+            if self.privileged:
+                # raw sockets deliver the IP header and every ICMP packet on the host
+                data = data[(data[0] & 0x0F) * 4:]
+
+            if len(data) < 8:
+                continue
+
+            icmp_type, _, _, identifier, sequence = struct.unpack("!BBHHH", data[:8])
+
+            if icmp_type != ICMP_ECHO_REPLY:
+                continue
+
+            # datagram sockets get the identifier rewritten by the kernel, replies are already ours
+            if self.privileged and identifier != self.identifier:
+                continue
+
+            entry = self.pending.get(sequence)
+            if entry is None or entry[1] != address:
+                continue
+
+            future, _, sent_at = entry
+            if not future.done():
+                future.set_result((time.perf_counter() - sent_at) * 1000)
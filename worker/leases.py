@@ -0,0 +1,123 @@
+import asyncio
+import math
+import os
+import socket
+import time
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from app.settings.config import MONITOR_SHARDS, MONITOR_LEASE_TTL, MONITOR_LEASE_RENEW_INTERVAL
+
+LEASES = "worker_leases"
+MEMBERS = "worker_members"
+
+
+def shard_of(server_id, shards=MONITOR_SHARDS):
+    # crc32 instead of hash(), the builtin is salted per process and workers must agree
+    return zlib.crc32(str(server_id).encode()) % shards
+
+
+class ShardLeases:
+
+    def __init__(self, db, shards=MONITOR_SHARDS, ttl=MONITOR_LEASE_TTL, renew_interval=MONITOR_LEASE_RENEW_INTERVAL):
+        self.leases = db[LEASES]
+        self.members = db[MEMBERS]
+        self.shards = shards
+        self.ttl = ttl
+        self.renew_interval = renew_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.owned = {}
+        self.stats = {"rounds": 0, "acquired": 0, "released": 0, "lost": 0, "errors": 0, "workers": 0}
+
+    def owns_server(self, server):
+        # sharding off: a single worker checks everything
+        if not self.shards:
+            return True
+
+        # a lease we failed to renew stops counting before it can expire in Mongo and be taken over
+        return self.owned.get(shard_of(server["_id"], self.shards), 0) > time.monotonic()
+
+    def heartbeat(self, now):
+        self.members.update_one({"_id": self.worker_id}, {"$set": {"expires_at": now + timedelta(seconds=self.ttl)}}, upsert=True)
+        return self.members.count_documents({"expires_at": {"$gt": now}})
+
+    def try_acquire(self, shard, now):
+        free = {"_id": shard, "$or": [{"owner": None}, {"owner": self.worker_id}, {"expires_at": {"$lt": now}}]}
+        lease = {"$set": {"owner": self.worker_id, "expires_at": now + timedelta(seconds=self.ttl)}}
+
+        try:
+            return self.leases.find_one_and_update(free, lease, upsert=True, return_document=ReturnDocument.AFTER) is not None
+        except DuplicateKeyError:
+            # the shard exists and somebody else holds it
+            return False
+
+    def release(self, shards):
+        if shards:
+            self.leases.update_many({"_id": {"$in": list(shards)}, "owner": self.worker_id}, {"$set": {"owner": None, "expires_at": None}})
+            self.stats["released"] += len(shards)
+
+    def rebalance(self):
+        if not self.shards:
+            return False
+
+        started = time.monotonic()
+        now = datetime.now(timezone.utc)
+        before = set(self.owned)
+
+        workers = self.heartbeat(now)
+        fair_share = math.ceil(self.shards / max(workers, 1))
+
+        self.leases.update_many({"owner": self.worker_id}, {"$set": {"expires_at": now + timedelta(seconds=self.ttl)}})
+        held = sorted(doc["_id"] for doc in self.leases.find({"owner": self.worker_id}, {"_id": 1}))
+        keep, extra = held[:fair_share], held[fair_share:]
+
+        # stop checking shed shards before anyone else can pick them up
+        valid_until = started + self.ttl - self.renew_interval
+        self.owned = {shard: valid_until for shard in keep}
+        self.release(extra)
+
+        if len(keep) < fair_share:
+            taken = {doc["_id"] for doc in self.leases.find({"owner": {"$ne": None}, "expires_at": {"$gte": now}}, {"_id": 1})}
+            for shard in range(self.shards):
+                if len(self.owned) >= fair_share:
+                    break
+                if shard not in taken and shard not in self.owned and self.try_acquire(shard, now):
+                    self.owned[shard] = valid_until
+                    self.stats["acquired"] += 1
+
+        self.stats["rounds"] += 1
+        self.stats["workers"] = workers
+        self.stats["lost"] += len(before - set(held))
+        return set(self.owned) != before
+
+    async def run(self, on_change):
+        reload_pending = False
+
+        while True:
+            await asyncio.sleep(self.renew_interval)
+
+            try:
+                reload_pending = await asyncio.to_thread(self.rebalance) or reload_pending
+                if reload_pending:
+                    await on_change()
+                    reload_pending = False
+            except PyMongoError as e:
+                # a failed reload is retried next round, the renewals must keep going
+                self.stats["errors"] += 1
+                print(f"[ERROR] SHARD LEASE ROUND FAILED: {e}")
+
+    def close(self):
+        # hand the shards over right away instead of letting them expire
+        owned, self.owned = list(self.owned), {}
+        try:
+            self.release(owned)
+            self.members.delete_one({"_id": self.worker_id})
+        except PyMongoError as e:
+            print(f"[ERROR] SHARD LEASE RELEASE FAILED: {e}")
+
+    def summary(self):
+        return dict(self.stats, worker_id=self.worker_id, shards=len(self.owned), total_shards=self.shards)
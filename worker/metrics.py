@@ -0,0 +1,36 @@
+import asyncio
+import time
+
+from aiohttp import web
+
+from app.services.metrics import Histogram, Gauge, Counter, render_metrics
+
+CHECK_SECONDS = Histogram("monitor_check_duration_seconds", "Check duration per protocol and result", labels=("protocol", "status"))
+SCHEDULER_LAG_SECONDS = Histogram("monitor_scheduler_lag_seconds", "Delay between a check's due time and its start")
+CHECKS_IN_FLIGHT = Gauge("monitor_checks_in_flight", "Checks currently running")
+EVENT_LOOP_LAG_SECONDS = Histogram("monitor_event_loop_lag_seconds", "Extra delay of a timer on the worker event loop")
+SMTP_SEND_SECONDS = Histogram("monitor_smtp_send_duration_seconds", "SMTP send latency", labels=("result",))
+ALERTS = Counter("monitor_alerts_total", "Alert deliveries by outcome", labels=("outcome",))
+STATE_TRANSITIONS = Counter("monitor_state_transitions_total", "Server health state changes by new state", labels=("state",))
+FLUSH_SECONDS = Histogram("monitor_flush_duration_seconds", "Batched Mongo flush latency", labels=("writer",))
+
+
+async def watch_event_loop_lag(interval=0.5):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG_SECONDS.observe(max(time.perf_counter() - start - interval, 0.0))
+
+
+async def handle_metrics(request):
+    return web.Response(text=render_metrics(), content_type="text/plain")
+
+
+async def start_metrics_server(port):
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "0.0.0.0", port).start()
+    return runner
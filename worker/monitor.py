@@ -1,18 +1,36 @@
 import asyncio
-from datetime import datetime
+import time
+from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
 
 import tornado
-from aiohttp import ClientSession
-from pymongo.client_session import ClientSession
-from pythonping import ping
 from tornado.platform.asyncio import AsyncIOMainLoop
 
 from app.database.database import get_db
-from worker.send_mail import send_mail
+from app.database.indexes import ensure_indexes
+from app.settings.config import MONITOR_RELOAD_INTERVAL, WORKER_METRICS_PORT
+from worker.alert_digest import AlertDigester
+from worker.alert_queue import AlertDispatcher
+from worker.health import DOWN, record_health, advance_state, should_alert
+from worker.history_writer import HistoryWriter
+from worker.http_client import fetch_status, close_session, probe_latency_summary
+from worker.icmp import IcmpEngine
+from worker.leases import ShardLeases
+from worker.metrics import CHECK_SECONDS, STATE_TRANSITIONS, watch_event_loop_lag, start_metrics_server
+from worker.scheduler import CheckScheduler
+from worker.server_registry import ServerRegistry
+from worker.status_writer import StatusWriter
+from worker.tcp import TcpProber, UnexpectedBanner
 
 db = get_db()
 servers_collection = db.servers
+status_writer = StatusWriter(servers_collection, db.user_versions)
+alert_dispatcher = AlertDispatcher()
+alert_digester = AlertDigester(alert_dispatcher)
+icmp_engine = IcmpEngine()
+tcp_prober = TcpProber()
+history_writer = HistoryWriter(db)
+shard_leases = ShardLeases(db)
 
 from datetime import datetime
 from zoneinfo import ZoneInfo
@@ -38,29 +56,16 @@ def generate_alert_body(server, result):
 
 
 
-def parse_last_alert(last_alert):
-    if not last_alert:
-        return None
-
-    if isinstance(last_alert, str):
-        return datetime.strptime(last_alert, "%d.%m.%Y %H:%M:%S").replace(tzinfo=ZoneInfo("Europe/Istanbul"))
-    if isinstance(last_alert, datetime):
-        return last_alert.replace(tzinfo=ZoneInfo("UTC")).astimezone(ZoneInfo("Europe/Istanbul"))
-    return last_alert
-
-
 async def check_http(server):
     url = f"http://{server['host']}:{server.get('port', 80)}"
     expected_status = server.get('expected_status', 200)
     timeout = server.get('timeout', 5)
 
     try:
-        async with ClientSession() as session:
-            async with session.get(url, timeout=timeout) as response:
-                status = response.status
-                return status == expected_status, status
+        status, timing = await fetch_status(url, timeout)
+        return status == expected_status, status, timing
     except Exception as e:
-        return False, str(e)
+        return False, str(e), {"error": type(e).__name__}
 
 
 async def check_https(server):
@@ -69,66 +74,169 @@ async def check_https(server):
     timeout = server.get('timeout', 5)
 
     try:
-        async with ClientSession() as session:
-            async with session.get(url, timeout=timeout) as response:
-                status = response.status
-                return status == expected_status, status
+        status, timing = await fetch_status(url, timeout)
+        return status == expected_status, status, timing
     except Exception as e:
-        return False, str(e)
+        return False, str(e), {"error": type(e).__name__}
 
 
 async def check_icmp(server):
-    def ping_sync():
-        response_list = ping(server['host'], count=1, timeout=server.get('timeout', 5))
-        return response_list.success(), response_list.rtt_avg_ms
+    try:
+        rtt = await icmp_engine.ping(server['host'], server.get('timeout', 5))
+        return True, rtt, {"total_ms": rtt}
+    except asyncio.TimeoutError:
+        return False, "Request timed out", {"error": "TimeoutError"}
+    except Exception as e:
+        return False, str(e), {"error": type(e).__name__}
+
+
+async def check_tcp(server):
+    try:
+        timing = await tcp_prober.probe(server['host'], server['port'], server.get('timeout', 5), server.get('send'), server.get('expect'))
+        return True, round(timing["connect_ms"], 2), timing
+    except UnexpectedBanner as e:
+        return False, f"Unexpected banner: {e}", {"error": "UnexpectedBanner"}
+    except asyncio.TimeoutError:
+        return False, "Connection timed out", {"error": "TimeoutError"}
+    except Exception as e:
+        return False, str(e), {"error": type(e).__name__}
+
+
+def build_check_result(server, protocol, success, result, timing, duration_ms, incident=False):
+    timing = timing or {}
+    error = timing.get("error")
 
-    return await asyncio.to_thread(ping_sync)
+    if not success and not error:
+        error = "UnexpectedStatus" if protocol in ('http', 'https') else "NoReply"
+
+    return {
+        "timestamp": datetime.now(timezone.utc),
+        "server_id": server['_id'],
+        "user_id": server.get('user_id'),
+        "protocol": protocol,
+        "status": 'OK' if success else 'FAIL',
+        "http_code": result if isinstance(result, int) and protocol in ('http', 'https') else None,
+        "rtt_ms": result if success and protocol == 'icmp' else None,
+        "latency_ms": timing.get("total_ms"),
+        "connect_ms": timing.get("connect_ms"),
+        "error": error,
+        "duration_ms": duration_ms,
+        "incident": incident,
+    }
 
 
 async def check_server(server):
+    # the shard moved to another worker since this check was scheduled
+    if not shard_leases.owns_server(server):
+        return
+
     protocol = server['protocol'].lower()
-    success, result = False, None
+    success, result, timing = False, None, None
+    start = time.perf_counter()
 
     if protocol == 'http':
-        success, result = await check_http(server)
+        success, result, timing = await check_http(server)
     elif protocol == 'https':
-        success, result = await check_https(server)
+        success, result, timing = await check_https(server)
     elif protocol == 'icmp':
-        success, result = await check_icmp(server)
+        success, result, timing = await check_icmp(server)
+    elif protocol == 'tcp':
+        success, result, timing = await check_tcp(server)
 
-    now = datetime.now(ZoneInfo("Europe/Istanbul"))
-    last_alert = parse_last_alert(server.get('last_alert_at'))
+    duration_ms = (time.perf_counter() - start) * 1000
+    CHECK_SECONDS.observe(duration_ms / 1000, protocol, 'OK' if success else 'FAIL')
+    confirmed = record_health(server, success)
+    previous_status = server.get('last_status')
+    previous_state, state = advance_state(server, success, confirmed)
+    incident = state == DOWN and previous_state != DOWN
+    await history_writer.record(build_check_result(server, protocol, success, result, timing, duration_ms, incident))
 
-    alert_interval = server.get('alert_interval', 60)
+    if confirmed:
+        server['last_status'] = 'OK' if success else 'FAIL'
 
-    send_alert = False
-
-    if not last_alert or (now - last_alert).total_seconds() > alert_interval * 60:
-        send_alert = True
-
-    if not success:
-        if not last_alert or (now - last_alert).total_seconds() > alert_interval * 60:
-            send_alert = True
+    now = datetime.now(timezone.utc)
+    send_alert = should_alert(server, now)
 
     if send_alert:
 
         body = generate_alert_body(server, result)
-        send_mail(server.get('contacts', []),f"Server Alert: {server['name']}",body,server_id=str(server["_id"])        )
+        alert_digester.add(server, result, body)
         server['last_alert_at'] = now
 
-    servers_collection.update_one({'_id': server['_id']}, {'$set': {'last_status': 'OK' if success else 'FAIL', 'last_checked_at': now, 'last_alert_at': server.get('last_alert_at')}})
+    # only transitions and alerts are written now, steady checks are folded into the periodic heartbeat
+    if state != previous_state or server.get('last_status') != previous_status or send_alert:
+        fields = {'state': state, 'last_status': server.get('last_status'), 'last_checked_at': now, 'last_alert_at': server.get('last_alert_at')}
+        if state != previous_state or server.get('last_status') != previous_status:
+            # live clients without change streams poll on this one
+            fields['status_changed_at'] = now
+        if state != previous_state:
+            fields['state_changed_at'] = now
+            STATE_TRANSITIONS.inc(state)
+        await status_writer.update(server['_id'], fields, server.get('user_id'))
+    else:
+        status_writer.touch(server['_id'], server.get('user_id'))
+
+
+def restart_dead_tasks(tasks, background):
+    # nobody awaits these, a crash would otherwise go unnoticed while the process stays up
+    for name, task in tasks.items():
+        if not task.done():
+            continue
+        error = None if task.cancelled() else task.exception()
+        print(f"[ERROR] BACKGROUND TASK {name.upper()} STOPPED: {error!r}, RESTARTING")
+        tasks[name] = asyncio.create_task(background[name]())
 
 
 async def monitor_loop():
+    await asyncio.to_thread(ensure_indexes, db)
+
+    await asyncio.to_thread(shard_leases.rebalance)
+
+    scheduler = CheckScheduler(check_server)
+    registry = ServerRegistry(servers_collection, scheduler, shard_leases)
+    background = {
+        "registry": registry.run,
+        "leases": lambda: shard_leases.run(registry.load),
+        "scheduler": scheduler.run,
+        "status writer": status_writer.run,
+        "history writer": history_writer.run,
+        "digests": alert_digester.run,
+        "loop lag": watch_event_loop_lag,
+    }
+    tasks = {name: asyncio.create_task(factory()) for name, factory in background.items()}
+    alert_dispatcher.start()
+
+    if WORKER_METRICS_PORT:
+        await start_metrics_server(WORKER_METRICS_PORT)
+
     while True:
-        servers = list(servers_collection.find({"is_active": True}))
-        tasks = [check_server(s) for s in servers]
-        await asyncio.gather(*tasks)
-        await asyncio.sleep(30)
+        await asyncio.sleep(MONITOR_RELOAD_INTERVAL)
+        restart_dead_tasks(tasks, background)
+        print(f"[REGISTRY] {registry.summary()}")
+        print(f"[LEASES] {shard_leases.summary()}")
+        print(f"[SCHEDULER] {scheduler.summary()}")
+        print(f"[HTTP POOL] {probe_latency_summary()}")
+        print(f"[TCP] {tcp_prober.summary()}")
+        print(f"[STATUS WRITER] {status_writer.summary()}")
+        print(f"[HISTORY] {history_writer.summary()}")
+        print(f"[ALERTS] {alert_dispatcher.summary()}")
+        print(f"[DIGESTS] {alert_digester.summary()}")
 
 
 if __name__ == "__main__":
     AsyncIOMainLoop().install()
     loop = asyncio.get_event_loop()
     loop.create_task(monitor_loop())
-    tornado.ioloop.IOLoop.current().start()
+    try:
+        tornado.ioloop.IOLoop.current().start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(status_writer.flush())
+        loop.run_until_complete(status_writer.flush_heartbeats())
+        loop.run_until_complete(history_writer.flush())
+        alert_digester.flush(force=True)
+        loop.run_until_complete(alert_dispatcher.close())
+        loop.run_until_complete(close_session())
+        icmp_engine.close()
+        shard_leases.close()
@@ -1,17 +1,17 @@
-from datetime import datetime
-from zoneinfo import ZoneInfo
+from datetime import datetime, timezone
 from app.database.database import get_db
 
-def log_monitor_event(server_id: str,log_type: str,message: str,contacts: list = None,status: str = None,response: str = None):
+def log_monitor_event(server_id: str,log_type: str,message: str,contacts: list = None,status: str = None,response: str = None,user_id: str = None):
 
     log_entry = {
         "server_id": server_id,
+        "user_id": user_id,
         "log_type": log_type,
         "message": message,
         "contacts": contacts or [],
         "status": status,
         "response": response,
-        "timestamp": datetime.now(ZoneInfo("Europe/Istanbul")).strftime("%d.%m.%Y %H:%M:%S")
+        "timestamp": datetime.now(timezone.utc)
     }
 
 
@@ -21,3 +21,26 @@ def log_monitor_event(server_id: str,log_type: str,message: str,contacts: list =
         result = logs_collection.insert_one(log_entry)
     except Exception as e:
         print(f"[ERROR] LOGGING FAILED: {e}")
+
+
+def log_monitor_events(servers: list,log_type: str,message: str,contacts: list = None,status: str = None,response: str = None):
+
+    # one entry per server covered by a digest, written in a single round trip
+    timestamp = datetime.now(timezone.utc)
+    log_entries = [{
+        "server_id": server["server_id"],
+        "user_id": server.get("user_id"),
+        "log_type": log_type,
+        "message": message,
+        "contacts": contacts or [],
+        "status": status,
+        "response": response,
+        "timestamp": timestamp
+    } for server in servers]
+
+
+    try:
+        db = get_db()
+        db.monitor_logs.insert_many(log_entries, ordered=False)
+    except Exception as e:
+        print(f"[ERROR] LOGGING FAILED: {e}")
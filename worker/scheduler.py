@@ -0,0 +1,182 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+
+from app.settings.config import (
+    MONITOR_DEFAULT_INTERVAL, MONITOR_MIN_INTERVAL, MONITOR_MAX_IN_FLIGHT,
+    MONITOR_RETRY_DELAY, MONITOR_DEGRADED_INTERVAL, MONITOR_STABLE_CHECKS, MONITOR_MAX_BACKOFF,
+)
+from worker.metrics import SCHEDULER_LAG_SECONDS, CHECKS_IN_FLIGHT
+
+
+class CheckScheduler:
+
+    def __init__(self, check, max_in_flight=MONITOR_MAX_IN_FLIGHT):
+        self.check = check
+        self.heap = []
+        self.servers = {}
+        self.due = {}
+        self.in_flight = set()
+        self.tasks = set()
+        self.counter = itertools.count()
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.stats = {"started": 0, "skipped_busy": 0, "timed_out": 0, "errors": 0, "retries": 0, "max_lag_ms": 0.0}
+
+    def interval(self, server):
+        return max(int(server.get("check_interval") or MONITOR_DEFAULT_INTERVAL), MONITOR_MIN_INTERVAL)
+
+    def current_interval(self, server):
+        interval = self.interval(server)
+
+        # failing servers are watched closely until they recover
+        if server.get("fail_streak", 0) > 0:
+            return max(min(interval, MONITOR_DEGRADED_INTERVAL), MONITOR_MIN_INTERVAL)
+
+        # long stable history backs off, doubling every MONITOR_STABLE_CHECKS clean checks up to the cap
+        if MONITOR_STABLE_CHECKS and server.get("ok_streak", 0) >= MONITOR_STABLE_CHECKS:
+            return interval * min(2 ** (server["ok_streak"] // MONITOR_STABLE_CHECKS), MONITOR_MAX_BACKOFF)
+
+        return interval
+
+    def retry_pending(self, server):
+        failures = server.get("fail_streak", 0)
+        return 0 < failures <= int(server.get("retry_count") or 0)
+
+    def deadline(self, server):
+        return int(server.get("timeout") or 5) + 10
+
+    def push(self, server_id, due):
+        self.due[server_id] = due
+        heapq.heappush(self.heap, (due, next(self.counter), server_id))
+
+    def add(self, server, start_now=False):
+        server_id = server["_id"]
+        previous = self.servers.get(server_id)
+
+        if previous is not None:
+            previous_interval = self.interval(previous)
+
+            # a running check holds this dict, refresh it in place so its results are not lost
+            for field in set(previous) - set(server):
+                del previous[field]
+            previous.update(server)
+
+            if server_id in self.due and previous_interval == self.interval(previous):
+                return
+        else:
+            self.servers[server_id] = server
+
+        if start_now:
+            self.push(server_id, time.monotonic())
+            return
+
+        # spread first checks over one interval so the fleet never fires at the same moment
+        self.push(server_id, time.monotonic() + random.uniform(0, self.interval(server)))
+
+    def remove(self, server_id):
+        self.servers.pop(server_id, None)
+        self.due.pop(server_id, None)
+
+    def sync(self, servers):
+        active_ids = set()
+
+        for server in servers:
+            active_ids.add(server["_id"])
+            self.add(server)
+
+        for server_id in list(self.servers):
+            if server_id not in active_ids:
+                self.remove(server_id)
+
+    def next_due(self, server, due, now):
+        interval = self.current_interval(server)
+        next_due = due + interval
+
+        # stay on the server's own grid; missed slots are skipped instead of piling up
+        if next_due <= now:
+            next_due += ((now - next_due) // interval + 1) * interval
+
+        return next_due
+
+    async def run(self):
+        while True:
+            if not self.heap:
+                await asyncio.sleep(0.5)
+                continue
+
+            due, _, server_id = self.heap[0]
+
+            if self.due.get(server_id) != due:
+                heapq.heappop(self.heap)
+                continue
+
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(min(delay, 0.5))
+                continue
+
+            heapq.heappop(self.heap)
+            await self.semaphore.acquire()
+
+            server = self.servers.get(server_id)
+            now = time.monotonic()
+
+            if server is None or self.due.get(server_id) != due:
+                self.semaphore.release()
+                continue
+
+            self.push(server_id, self.next_due(server, due, now))
+
+            if server_id in self.in_flight:
+                self.stats["skipped_busy"] += 1
+                self.semaphore.release()
+                continue
+
+            self.stats["max_lag_ms"] = max(self.stats["max_lag_ms"], (now - due) * 1000)
+            SCHEDULER_LAG_SECONDS.observe(now - due)
+            self.stats["started"] += 1
+
+            task = asyncio.create_task(self.run_check(server_id, server))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def run_check(self, server_id, server):
+        self.in_flight.add(server_id)
+        CHECKS_IN_FLIGHT.set(len(self.in_flight))
+
+        try:
+            await asyncio.wait_for(self.check(server), self.deadline(server))
+            self.reschedule(server_id, server)
+        except asyncio.TimeoutError:
+            self.stats["timed_out"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"[ERROR] CHECK FAILED {server.get('host')}: {e}")
+        finally:
+            self.in_flight.discard(server_id)
+            CHECKS_IN_FLIGHT.set(len(self.in_flight))
+            self.semaphore.release()
+
+    def reschedule(self, server_id, server):
+        if server_id not in self.servers:
+            return
+
+        now = time.monotonic()
+
+        if self.retry_pending(server):
+            # confirm a fresh failure with a quick jittered re-check instead of waiting a full interval
+            due = now + random.uniform(0.5, 1.5) * MONITOR_RETRY_DELAY
+            self.stats["retries"] += 1
+        else:
+            due = now + self.current_interval(server)
+
+        # only pull checks forward, the slot pushed at dispatch already covers a slower interval
+        if due < self.due.get(server_id, due):
+            self.push(server_id, due)
+
+    def summary(self):
+        summary = dict(self.stats, servers=len(self.servers), in_flight=len(self.in_flight))
+        self.stats["max_lag_ms"] = 0.0
+        return summary
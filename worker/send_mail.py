@@ -1,55 +1,70 @@
 import smtplib
+import time
 from datetime import datetime
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.utils import format_datetime
 from zoneinfo import ZoneInfo
-from app.settings.config import SMTP_HOST, SMTP_PORT, SMTP_EMAİL, SMTP_PASSWORD, SENDER_NAME
-from worker.monitor_log import log_monitor_event
+from app.settings.config import SMTP_HOST, SMTP_PORT, SMTP_EMAİL, SMTP_PASSWORD, SENDER_NAME, SMTP_IDLE_TIMEOUT
 
 
-def send_mail(to_list, subject, body,server_id=None):
-    smtp_host = SMTP_HOST
-    smtp_port =  SMTP_PORT
-    smtp_email = SMTP_EMAİL
-    smtp_password = SMTP_PASSWORD
-    sender_name =  SENDER_NAME
-
-    to_addresses = to_list
-    subject = subject
-
+def build_message(to_list, subject, body):
     msg = MIMEMultipart("mixed")
-    msg['From'] = f"{sender_name} <{smtp_email}>"
-    msg['To'] = ", ".join(to_addresses)
+    msg['From'] = f"{SENDER_NAME} <{SMTP_EMAİL}>"
+    msg['To'] = ", ".join(to_list)
     msg['Subject'] = subject
     msg["Date"] = format_datetime(datetime.now(ZoneInfo("Europe/Istanbul")))
 
     msg.attach(MIMEText(body, "plain", "utf-8"))
+    return msg
+
+
+class SmtpConnection:
+
+    def __init__(self):
+        self.server = None
+        self.last_used = 0.0
+        self.connects = 0
+
+    def open(self):
+        self.close()
+        server = smtplib.SMTP(host=SMTP_HOST, port=SMTP_PORT, timeout=15)
+        server.ehlo()
+        server.starttls()
+        server.ehlo()
+        server.login(SMTP_EMAİL, SMTP_PASSWORD)
+        self.server = server
+        self.connects += 1
+
+    def close(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except Exception:
+            pass
+        self.server = None
+
+    def ensure_open(self):
+        if self.server is not None and time.monotonic() - self.last_used > SMTP_IDLE_TIMEOUT:
+            # most relays drop idle sessions, check before reusing an old one
+            try:
+                self.server.noop()
+            except Exception:
+                # the session is gone, drop the socket without another round trip
+                self.server.close()
+                self.server = None
+
+        if self.server is None:
+            self.open()
+
+    def send(self, msg):
+        self.ensure_open()
+
+        try:
+            self.server.send_message(msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            self.open()
+            self.server.send_message(msg)
 
-    try:
-        with smtplib.SMTP(host=smtp_host, port=smtp_port, timeout=15) as server:
-            server.ehlo()
-            server.starttls()
-            server.ehlo()
-            server.login(smtp_email, smtp_password)
-            server.send_message(msg)
-
-        if server_id:
-            log_monitor_event(
-                server_id=server_id,
-                log_type="alert",
-                message="Alert email sent",
-                contacts=to_list,
-                status="SUCCESS",
-                response=body
-            )
-    except Exception as e:
-        if server_id:
-            log_monitor_event(
-                server_id=server_id,
-                log_type="error",
-                message=f"Email sending failed: {e}",
-                contacts=to_list,
-                status="FAIL",
-                response=body
-            )
+        self.last_used = time.monotonic()
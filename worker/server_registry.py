@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.settings.config import MONITOR_RELOAD_INTERVAL, MONITOR_RESYNC_INTERVAL
+from worker.health import seed_health
+
+# fields the worker writes itself, changes to only these must not come back as config events
+WORKER_FIELDS = ["state", "state_changed_at", "status_changed_at", "last_status", "last_checked_at", "last_alert_at"]
+
+# in-memory only, used by the scheduler for retries and adaptive intervals;
+# seeded from the persisted state when a server first loads here (restart or shard handover)
+HEALTH_FIELDS = ["fail_streak", "ok_streak", "flips"]
+
+CHANGE_PIPELINE = [
+    {"$addFields": {"changed_fields": {"$map": {"input": {"$objectToArray": {"$ifNull": ["$updateDescription.updatedFields", {}]}}, "as": "f", "in": "$$f.k"}}}},
+    {"$match": {"$or": [
+        {"operationType": {"$in": ["insert", "replace", "delete"]}},
+        {"changed_fields": {"$elemMatch": {"$nin": WORKER_FIELDS}}},
+        {"updateDescription.removedFields.0": {"$exists": True}},
+    ]}},
+]
+
+
+class ServerRegistry:
+
+    def __init__(self, collection, scheduler, leases=None):
+        self.collection = collection
+        self.scheduler = scheduler
+        self.leases = leases
+        self.loop = None
+        self.thread = None
+        self.resume_token = None
+        self.watching = False
+        self.unsupported = False
+        self.last_load = 0.0
+        self.stats = {"loads": 0, "changes": 0, "watch_errors": 0}
+
+    def matches(self, server):
+        if self.leases is not None and not self.leases.owns_server(server):
+            return False
+        return server.get("is_active") is True
+
+    def carry_state(self, server):
+        # the in-memory copy is ahead of the buffered status writes, keep its view of the worker fields
+        previous = self.scheduler.servers.get(server["_id"])
+        if not previous:
+            # first sight of this server in this process, after a restart or a shard handover
+            return seed_health(server)
+
+        for field in WORKER_FIELDS + HEALTH_FIELDS:
+            if field in previous:
+                server[field] = previous[field]
+        return server
+
+    async def load(self):
+        servers = await asyncio.to_thread(lambda: list(self.collection.find({"is_active": True})))
+        self.scheduler.sync([self.carry_state(s) for s in servers if self.matches(s)])
+        self.last_load = time.monotonic()
+        self.stats["loads"] += 1
+
+    def apply_change(self, change):
+        self.stats["changes"] += 1
+        server_id = change["documentKey"]["_id"]
+        server = change.get("fullDocument")
+
+        if change["operationType"] == "delete" or server is None or not self.matches(server):
+            self.scheduler.remove(server_id)
+        else:
+            self.scheduler.add(self.carry_state(server), start_now=change["operationType"] == "insert")
+
+    def watch_blocking(self):
+        while True:
+            try:
+                with self.collection.watch(CHANGE_PIPELINE, full_document="updateLookup", resume_after=self.resume_token, max_await_time_ms=1000) as stream:
+                    self.watching = True
+                    while stream.alive:
+                        change = stream.try_next()
+                        self.resume_token = stream.resume_token
+                        if change is not None:
+                            self.loop.call_soon_threadsafe(self.apply_change, change)
+            except OperationFailure as e:
+                self.watching = False
+                self.stats["watch_errors"] += 1
+
+                # standalone servers have no change streams, stay on periodic reloads
+                if e.code == 40573:
+                    self.unsupported = True
+                    print("[REGISTRY] change streams not available, falling back to periodic reload")
+                    return
+
+                self.resume_token = None
+                print(f"[ERROR] CHANGE STREAM FAILED: {e}")
+                time.sleep(5)
+            except PyMongoError as e:
+                self.watching = False
+                self.stats["watch_errors"] += 1
+                print(f"[ERROR] CHANGE STREAM FAILED: {e}")
+                time.sleep(5)
+
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.thread = threading.Thread(target=self.watch_blocking, name="server-change-stream", daemon=True)
+        self.thread.start()
+
+    async def run(self):
+        await self.load()
+        self.start()
+
+        while True:
+            await asyncio.sleep(1)
+
+            interval = MONITOR_RESYNC_INTERVAL if self.watching else MONITOR_RELOAD_INTERVAL
+            if time.monotonic() - self.last_load >= interval:
+                try:
+                    await self.load()
+                except PyMongoError as e:
+                    print(f"[ERROR] SERVER RELOAD FAILED: {e}")
+
+    def summary(self):
+        return dict(self.stats, watching=self.watching, change_streams_unsupported=self.unsupported, servers=len(self.scheduler.servers))
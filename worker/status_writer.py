@@ -0,0 +1,118 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne, UpdateMany
+
+from app.settings.config import STATUS_BATCH_SIZE, STATUS_FLUSH_INTERVAL, STATUS_HEARTBEAT_INTERVAL
+from worker.metrics import FLUSH_SECONDS
+
+HEARTBEAT_CHUNK = 1000
+
+
+class StatusWriter:
+
+    def __init__(self, collection, versions=None, batch_size=STATUS_BATCH_SIZE, flush_interval=STATUS_FLUSH_INTERVAL, heartbeat_interval=STATUS_HEARTBEAT_INTERVAL):
+        self.collection = collection
+        self.versions = versions
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.pending = {}
+        self.changed_users = set()
+        self.heartbeats = {}
+        self.flush_lock = asyncio.Lock()
+        self.stats = {"updates": 0, "flushes": 0, "written": 0, "heartbeats": 0, "errors": 0, "backpressure_waits": 0, "last_flush_ms": 0.0, "max_flush_ms": 0.0}
+
+    async def update(self, server_id, fields, user_id=None):
+        # several updates for the same server inside one batch collapse into a single write
+        self.pending.setdefault(server_id, {}).update(fields)
+        if user_id:
+            self.changed_users.add(user_id)
+        self.stats["updates"] += 1
+
+        if len(self.pending) >= self.batch_size:
+            if self.flush_lock.locked():
+                self.stats["backpressure_waits"] += 1
+            await self.flush()
+
+    async def flush(self):
+        async with self.flush_lock:
+            if not self.pending:
+                return
+
+            batch, self.pending = self.pending, {}
+            users, self.changed_users = self.changed_users, set()
+            operations = [UpdateOne({"_id": server_id}, {"$set": fields}) for server_id, fields in batch.items()]
+            start = time.perf_counter()
+
+            try:
+                await asyncio.to_thread(self.write, operations, users)
+                self.stats["written"] += len(operations)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[ERROR] STATUS FLUSH FAILED: {e}")
+
+                # keep the failed batch for the next flush, newer values win
+                for server_id, fields in batch.items():
+                    self.pending[server_id] = {**fields, **self.pending.get(server_id, {})}
+                self.changed_users.update(users)
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            FLUSH_SECONDS.observe(elapsed_ms / 1000, "status")
+            self.stats["flushes"] += 1
+            self.stats["last_flush_ms"] = elapsed_ms
+            self.stats["max_flush_ms"] = max(self.stats["max_flush_ms"], elapsed_ms)
+
+    def write(self, operations, users):
+        self.collection.bulk_write(operations, ordered=False)
+
+        # the API keys its ETags and response cache on these, the servers are written first so a new version never shows old data
+        if self.versions is not None and users:
+            self.versions.bulk_write([UpdateOne({"_id": str(user_id)}, {"$inc": {"servers": 1}}, upsert=True) for user_id in users], ordered=False)
+
+    def touch(self, server_id, user_id=None):
+        self.heartbeats[server_id] = user_id
+
+    async def flush_heartbeats(self):
+        async with self.flush_lock:
+            if not self.heartbeats:
+                return
+
+            heartbeats, self.heartbeats = self.heartbeats, {}
+            server_ids = list(heartbeats)
+            users = {user_id for user_id in heartbeats.values() if user_id}
+            now = datetime.now(timezone.utc)
+
+            # one last_checked_at stamp for every server that checked in since the previous heartbeat
+            operations = [
+                UpdateMany({"_id": {"$in": server_ids[i:i + HEARTBEAT_CHUNK]}}, {"$set": {"last_checked_at": now}})
+                for i in range(0, len(server_ids), HEARTBEAT_CHUNK)
+            ]
+            start = time.perf_counter()
+
+            try:
+                await asyncio.to_thread(self.write, operations, users)
+                self.stats["heartbeats"] += len(server_ids)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[ERROR] HEARTBEAT FLUSH FAILED: {e}")
+                self.heartbeats = {**heartbeats, **self.heartbeats}
+
+            FLUSH_SECONDS.observe(time.perf_counter() - start, "heartbeat")
+
+    async def run(self):
+        last_heartbeat = time.monotonic()
+
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+            if time.monotonic() - last_heartbeat >= self.heartbeat_interval:
+                await self.flush_heartbeats()
+                last_heartbeat = time.monotonic()
+
+    def summary(self):
+        summary = dict(self.stats, pending=len(self.pending), pending_heartbeats=len(self.heartbeats))
+        self.stats["max_flush_ms"] = 0.0
+        return summary
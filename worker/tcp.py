@@ -0,0 +1,89 @@
+import asyncio
+import ipaddress
+import socket
+import time
+
+from app.settings.config import TCP_DNS_CACHE_TTL, TCP_BANNER_BYTES
+
+
+class UnexpectedBanner(Exception):
+    pass
+
+
+class TcpProber:
+
+    def __init__(self):
+        self.dns_cache = {}
+        self.stats = {"count": 0, "connect_ms": 0.0, "total_ms": 0.0, "banners": 0}
+
+    async def resolve(self, host, port):
+        try:
+            ipaddress.ip_address(host)
+            return host
+        except ValueError:
+            pass
+
+        cached = self.dns_cache.get(host)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        address = infos[0][4][0]
+        self.dns_cache[host] = (address, time.monotonic() + TCP_DNS_CACHE_TTL)
+        return address
+
+    async def probe(self, host, port, timeout, send=None, expect=None):
+        # connect, optionally exchange one banner, and hang up; no request/response cycle like http
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        address = await asyncio.wait_for(self.resolve(host, port), timeout)
+
+        start = time.perf_counter()
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(address, port), max(0.0, deadline - loop.time()))
+        timing = {"connect_ms": (time.perf_counter() - start) * 1000}
+
+        try:
+            if send:
+                writer.write(send.encode())
+                await writer.drain()
+
+            if expect:
+                banner = await asyncio.wait_for(self.read_banner(reader, expect.encode()), max(0.0, deadline - loop.time()))
+                self.stats["banners"] += 1
+                if expect.encode() not in banner:
+                    raise UnexpectedBanner(banner[:80].decode(errors="replace").strip())
+        finally:
+            # wait for the transport to finish closing inside the check's own deadline, abort if it will not
+            writer.close()
+            try:
+                await asyncio.wait_for(writer.wait_closed(), max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                writer.transport.abort()
+            except OSError:
+                pass
+
+        timing["total_ms"] = (time.perf_counter() - start) * 1000
+        self.stats["count"] += 1
+        self.stats["connect_ms"] += timing["connect_ms"]
+        self.stats["total_ms"] += timing["total_ms"]
+        return timing
+
+    async def read_banner(self, reader, expect):
+        data = b""
+        while len(data) < TCP_BANNER_BYTES:
+            chunk = await reader.read(TCP_BANNER_BYTES - len(data))
+            if not chunk:
+                break
+            data += chunk
+            if expect in data:
+                break
+        return data
+
+    def summary(self):
+        count = self.stats["count"]
+        return {
+            "probes": count,
+            "banners": self.stats["banners"],
+            "avg_connect_ms": round(self.stats["connect_ms"] / count, 2) if count else None,
+            "avg_total_ms": round(self.stats["total_ms"] / count, 2) if count else None,
+        }